@@ -2,7 +2,9 @@
 Configuration Management for Automated Video Processing System
 """
 import os
+import functools
 from pathlib import Path
+from typing import Dict, Optional
 
 # Base directory
 BASE_DIR = Path(__file__).parent
@@ -22,30 +24,46 @@ for dir_path in DIRS.values():
     dir_path.mkdir(parents=True, exist_ok=True)
 
 # Resolution configurations
+# rate_control: 'capped_crf' (CRF quality, bitrate only as a VBV cap), 'cbr' (target bitrate, no CRF)
+# or '2pass' (two-pass VBR at the target bitrate; GPU encoders do a single VBR pass).
+# tune / codec_params: x264/x265 -tune and -x264-params/-x265-params for the rung (software encoders only);
+# small rungs gain little from expensive motion search and are often played on weak devices
 RESOLUTIONS = {
     '360p': {
         'height': 360,
         'bitrate_video': '500k',
         'bitrate_audio': '96k',
-        'preset': 'medium'
+        'preset': 'medium',
+        'rate_control': 'capped_crf',
+        'tune': 'fastdecode',
+        'codec_params': 'ref=2:subme=6'
     },
     '480p': {
         'height': 480,
         'bitrate_video': '1000k',
         'bitrate_audio': '128k',
-        'preset': 'medium'
+        'preset': 'medium',
+        'rate_control': 'capped_crf',
+        'tune': 'fastdecode',
+        'codec_params': 'ref=2:subme=6'
     },
     '720p': {
         'height': 720,
         'bitrate_video': '2500k',
         'bitrate_audio': '192k',
-        'preset': 'medium'
+        'preset': 'medium',
+        'rate_control': 'capped_crf',
+        'tune': 'film',
+        'codec_params': None
     },
     '1080p': {
         'height': 1080,
         'bitrate_video': '5000k',
         'bitrate_audio': '192k',
-        'preset': 'medium'
+        'preset': 'medium',
+        'rate_control': 'capped_crf',
+        'tune': 'film',
+        'codec_params': None
     }
 }
 
@@ -56,9 +74,19 @@ FFMPEG_CONFIG = {
     'preset': 'medium',
     'crf': 23,  # Constant Rate Factor (18-28, lower = better quality)
     'pixel_format': 'yuv420p',
-    'max_threads': 0  # Use all available threads
+    'max_threads': 0,  # Use all available threads
+    # Hard-burn tuning: static text over natural video needs few refs and a short lookahead
+    'burn_tune': 'film',
+    'burn_x264_params': 'ref=2:bframes=2:rc-lookahead=10:me=hex:subme=6:trellis=1:sliced-threads=1',
+    'burn_max_threads': 16,  # x264 scales poorly past this; avoids pool contention on big hosts
+    'burn_low_fps_keyint': 'keyint=48:min-keyint=24',  # Applied when input is <= 30 fps
+    # Use a GPU H.264 encoder when one works on this host (set FFMPEG_HW_ENCODING=off to disable)
+    'hardware_encoding': os.getenv('FFMPEG_HW_ENCODING', 'auto').lower() != 'off'
 }
 
+# Hardware H.264 encoders to try (in priority order)
+HARDWARE_ENCODERS = ['h264_nvenc', 'h264_qsv']
+
 # Subtitle settings
 SUBTITLE_CONFIG = {
     'soft_subtitle': True,  # True for soft embed, False for hard burn
@@ -106,7 +134,9 @@ PROCESSING_CONFIG = {
     'keep_original_files': False,  # Don't keep originals to save space (especially for cloud)
     'low_memory_mode': IS_CLOUD_ENV,  # Enable memory optimizations on cloud platforms
     'batch_processing': False,
-    'parallel_encoding': False  # Encode multiple resolutions simultaneously
+    'parallel_encoding': False,  # Encode multiple resolutions simultaneously
+    'adaptive_ladder': False,  # Opt-in: sample-encode to skip rungs starved for the source's complexity
+    'allow_upscale': False  # Encode rungs taller than the source when explicitly requested
 }
 
 # Web interface settings
@@ -115,7 +145,21 @@ WEB_CONFIG = {
     'port': int(os.getenv('PORT', 5000)),
     'debug': os.getenv('FLASK_ENV', 'production') != 'production',
     'max_upload_size': 5 * 1024 * 1024 * 1024,  # 5GB (for large video files)
-    'allowed_hosts': ['localhost', '127.0.0.1']
+    'allowed_hosts': ['localhost', '127.0.0.1'],
+    # Jobs processed at once; each encode already uses every core through FFmpeg's own threads,
+    # so raise this only with the RAM for several encodes
+    'max_concurrent_jobs': max(1, int(os.getenv('MAX_CONCURRENT_JOBS', 1))),
+    # Seconds a finished job stays in the job list before it is moved to the archive (0 = keep
+    # until the MAX_COMPLETED_JOBS cap pushes it out); users often come back much later for results
+    'completed_job_ttl': int(os.getenv('COMPLETED_JOB_TTL', 0)),
+    # Request threads when served by waitress; its I/O loop streams responses (and sendfile-able
+    # downloads) on its own, so a few threads cover many pollers and concurrent downloads
+    'server_threads': int(os.getenv('WEB_THREADS', 8)),
+    # Behind nginx: internal location mapped to BASE_DIR (e.g. '/internal-files/'); videos are then
+    # served by nginx via X-Accel-Redirect instead of through the Python worker
+    'accel_redirect_prefix': os.getenv('X_ACCEL_REDIRECT_PREFIX', ''),
+    # Behind Apache (mod_xsendfile) or lighttpd: send_file emits X-Sendfile with the absolute path
+    'use_x_sendfile': os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
 }
 
 # Cloud deployment options
@@ -145,6 +189,108 @@ def get_output_filename(original_name: str, resolution: str, with_subtitles: boo
     subtitle_tag = '_subtitled' if with_subtitles else ''
     return f"{base_name}_{resolution}{subtitle_tag}.mp4"
 
+# On-disk cache of the FFmpeg capability probe, reused across processes
+FFMPEG_CAPS_CACHE = DIRS['temp'] / 'ffmpeg_caps.json'
+
+@functools.lru_cache(maxsize=1)
+def get_ffmpeg_capabilities() -> Dict:
+    """
+    Probe the installed FFmpeg once with `ffmpeg -version`
+    
+    The result is cached per process and on disk, keyed by the binary's path,
+    mtime and size, so new worker processes skip the spawn until FFmpeg is
+    upgraded or replaced.
+    
+    Returns:
+        Dictionary with 'available' (bool), 'version' (first output line)
+        and 'configuration' (the build's configure flags)
+    """
+    import json
+    import shutil
+    import subprocess
+    
+    caps = {'available': False, 'version': '', 'configuration': ''}
+    
+    ffmpeg_path = shutil.which('ffmpeg')
+    if not ffmpeg_path:
+        return caps
+    
+    try:
+        stat = os.stat(ffmpeg_path)
+    except OSError:
+        return caps
+    cache_key = [ffmpeg_path, stat.st_mtime_ns, stat.st_size]
+    
+    try:
+        cached = json.loads(FFMPEG_CAPS_CACHE.read_text(encoding='utf-8'))
+        if cached.get('key') == cache_key:
+            return cached['caps']
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, '-version'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return caps
+    
+    lines = result.stdout.splitlines()
+    caps['available'] = result.returncode == 0
+    caps['version'] = lines[0] if lines else ''
+    for line in lines:
+        if line.startswith('configuration:'):
+            caps['configuration'] = line[len('configuration:'):].strip()
+            break
+    
+    # Only successful probes are persisted; a failed run is retried by the next process
+    if caps['available']:
+        partial_path = FFMPEG_CAPS_CACHE.with_name(f"{FFMPEG_CAPS_CACHE.name}.{os.getpid()}.part")
+        try:
+            partial_path.write_text(json.dumps({'key': cache_key, 'caps': caps}), encoding='utf-8')
+            partial_path.replace(FFMPEG_CAPS_CACHE)
+        except OSError:
+            pass
+    
+    return caps
+
+@functools.lru_cache(maxsize=1)
+def get_hardware_encoder() -> Optional[str]:
+    """
+    Find a hardware H.264 encoder that actually works on this host
+    
+    FFmpeg builds often list NVENC/QSV even when no GPU is present, so each
+    candidate is checked with a one-frame test encode. Cached per process.
+    
+    Returns:
+        Encoder name (e.g. 'h264_nvenc'), or None to use the software encoder
+    """
+    if not FFMPEG_CONFIG['hardware_encoding']:
+        return None
+    
+    import subprocess
+    
+    for encoder in HARDWARE_ENCODERS:
+        cmd = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', 'color=black:size=256x256',
+            '-frames:v', '1',
+            '-c:v', encoder,
+            '-f', 'null', '-'
+        ]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=15)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if result.returncode == 0:
+            return encoder
+    
+    return None
+
 def validate_config():
     """Validate configuration and check for FFmpeg installation"""
     import shutil
@@ -2,7 +2,9 @@
 Logging and Error Handling System
 """
 import logging
+import os
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
@@ -64,6 +66,10 @@ class ProcessingLogger:
         """Log critical message"""
         self.logger.critical(message)
     
+    def is_enabled_for(self, level: int) -> bool:
+        """Check if a message at this level would be emitted"""
+        return self.logger.isEnabledFor(level)
+    
     def log_processing_start(self, video_url: str, subtitle_url: str):
         """Log the start of processing"""
         self.info("=" * 80)
@@ -141,6 +147,44 @@ class ValidationError(ProcessingError):
     """Exception raised for validation failures"""
     pass
 
+class JobCancelled(ProcessingError):
+    """Exception raised when the user cancels a job"""
+    def __init__(self, message="Job cancelled by user"):
+        super().__init__(message)
+
+
+class StderrTail:
+    """
+    Drain a child process's stderr on a background thread, keeping only the end of it
+    
+    Reading stderr only after stdout closes can deadlock: once a child fills the
+    stderr pipe it blocks, and stops writing the stdout it is being followed on.
+    """
+    
+    def __init__(self, stream, max_bytes: int = 65536):
+        self._fd = stream.fileno()
+        self._max_bytes = max_bytes
+        self._tail = bytearray()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+    
+    def _drain(self):
+        try:
+            while True:
+                chunk = os.read(self._fd, self._max_bytes)
+                if not chunk:
+                    break
+                self._tail += chunk
+                if len(self._tail) > self._max_bytes:
+                    del self._tail[:-self._max_bytes]
+        except OSError:
+            pass  # Pipe closed under us (e.g. after a cancelled run)
+    
+    def read(self) -> str:
+        """Wait for stderr to close and return what was kept of it"""
+        self._thread.join()
+        return self._tail.decode('utf-8', 'replace')
+
 
 # Global logger instance
 logger = ProcessingLogger()
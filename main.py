@@ -35,7 +35,8 @@ class VideoProcessingPipeline:
         
         logger.info("Video Processing Pipeline initialized")
     
-    def generate_job_id(self) -> str:
+    @staticmethod
+    def generate_job_id() -> str:
         """Generate unique job identifier"""
         return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     
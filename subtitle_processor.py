@@ -2,14 +2,339 @@
 Subtitle Integration Module
 Handles soft embedding and hard burning of subtitles
 """
+import codecs
+import functools
+import hashlib
 import subprocess
 import json
+import logging
+import mmap
 import os
+import re
+import shlex
+import tempfile
+import threading
+import types
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Mapping, NamedTuple, Tuple
 
-from config import SUBTITLE_CONFIG, DIRS, FFMPEG_CONFIG
-from logger import logger, SubtitleError
+from config import SUBTITLE_CONFIG, DIRS, FFMPEG_CONFIG, get_ffmpeg_capabilities, get_hardware_encoder
+from logger import logger, SubtitleError, StderrTail
+
+# Complete V4+ style format, shared by every Default style line we emit
+ASS_STYLE_FIELDS = [
+    'Name', 'Fontname', 'Fontsize', 'PrimaryColour', 'SecondaryColour', 'OutlineColour',
+    'BackColour', 'Bold', 'Italic', 'Underline', 'StrikeOut', 'ScaleX', 'ScaleY', 'Spacing',
+    'Angle', 'BorderStyle', 'Outline', 'Shadow', 'Alignment', 'MarginL', 'MarginR', 'MarginV',
+    'Encoding'
+]
+ASS_STYLE_FORMAT_LINE = 'Format: ' + ', '.join(ASS_STYLE_FIELDS) + '\n'
+ASS_DEFAULT_STYLE_TEMPLATE = (
+    'Style: Default,{font_name},24,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,'
+    '0,0,0,0,100,100,0,0,1,2,0,2,20,20,30,1\n'
+)
+
+ASS_EVENT_FORMAT_LINE = 'Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n'
+
+# Everything convert_srt_to_ass writes before the first Dialogue line
+ASS_SCRIPT_HEADER_TEMPLATE = (
+    '[Script Info]\n'
+    'ScriptType: v4.00+\n'
+    'PlayResX: {play_res_x}\n'
+    'PlayResY: {play_res_y}\n'
+    'ScaledBorderAndShadow: yes\n'
+    '\n'
+    '[V4+ Styles]\n'
+    + ASS_STYLE_FORMAT_LINE
+    + ASS_DEFAULT_STYLE_TEMPLATE
+    + '\n'
+    '[Events]\n'
+    + ASS_EVENT_FORMAT_LINE
+)
+
+# Part of the converted-ASS cache key; bump it whenever convert_srt_to_ass output changes
+SRT_TO_ASS_VERSION = b'2'
+
+# SRT inline formatting tags and their (open, close) ASS override equivalents
+SRT_TAG_REPLACEMENTS = {
+    'i': (r'{\i1}', r'{\i0}'),
+    'b': (r'{\b1}', r'{\b0}'),
+    'u': (r'{\u1}', r'{\u0}'),
+    's': (r'{\s1}', r'{\s0}'),
+}
+
+# Compiled once: conversion runs these for every cue of every subtitle file
+SRT_TIMESTAMP_RE = re.compile(r'(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})')
+# One cue: the timing line (any position hints after the end time are skipped)
+# followed by its run of non-blank text lines; cue numbers fall outside the match.
+# Both timestamps are captured as (hours, minutes, seconds, millis) groups so they
+# need no second parse
+SRT_CUE_RE = re.compile(
+    r'^[^\S\n]*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[^\S\n]*-->'
+    r'[^\S\n]*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[^\n]*\n?'
+    r'((?:[^\S\n]*\S[^\n]*(?:\n|\Z))*)',
+    re.MULTILINE
+)
+# Braces in SRT text, handled like FFmpeg's SRT decoder: {\anN} positioning is
+# kept, other {\...} override blocks are stripped and any other brace is
+# escaped, since a literal one would open an ASS override block
+SRT_BRACE_RE = re.compile(r'\{\\an[1-9]\}|\{\\[^}]*\}|[{}]')
+ASS_BRACE_ESCAPES = {'{': r'\{', '}': r'\}'}
+NEWLINE_RE = re.compile(r'\r\n?|\n')
+# Any HTML-style tag; group 1 marks a closing tag, group 2 is the tag body
+HTML_TAG_RE = re.compile(r'<(/?)([a-zA-Z][^>]*)>')
+# Colour attribute of a <font> tag body, as #RRGGBB (quoted or not)
+SRT_FONT_COLOR_RE = re.compile(r'\bcolor\s*=\s*["\']?#?([0-9a-f]{2})([0-9a-f]{2})([0-9a-f]{2})\b', re.IGNORECASE)
+
+# Paths inside single-quoted filter arguments: forward slashes for FFmpeg,
+# escaped colons (drive letters) and escaped single quotes, all in one pass.
+# Commas need no escaping inside the quotes
+FFMPEG_FILTER_PATH_TABLE = str.maketrans({'\\': '/', ':': r'\:', "'": r"\'"})
+
+# Hard-burn filter templates; only the escaped paths and watermark font vary per call
+SUBTITLE_FILTER_TEMPLATE = "subtitles=filename='{subtitle}':fontsdir='{fonts_dir}':charenc=UTF-8"
+WATERMARK_FILTER_TEMPLATE = (
+    "drawtext=text='{text}':fontfile={font}:fontsize=24:fontcolor=white:borderw=2:bordercolor=black"
+    ":x=(w-text_w)/2:y=30:enable='lt(t,10)'"
+)
+WATERMARK_TEXT = "This is MovieDownloadSL..."
+
+# Key FFmpeg's -progress stream uses for the output position (in microseconds)
+PROGRESS_OUT_TIME_KEY = b'out_time_ms='
+
+# Bytes read from the progress pipe per os.read call
+PROGRESS_READ_SIZE = 65536
+
+# Audio codecs that can be stream-copied into an MP4 container
+MP4_COPY_AUDIO_CODECS = {'aac', 'ac3', 'eac3', 'mp3'}
+
+# Sinhala font files we look for (priority order) and the family name libass should request
+SINHALA_FONT_FAMILIES = {
+    'bindumathi.ttf': 'bindumathi',
+    'NotoSansSinhala-Regular.ttf': 'Noto Sans Sinhala',
+    'NotoSansSinhala.ttf': 'Noto Sans Sinhala',
+    'NotoSansSinhala-Bold.ttf': 'Noto Sans Sinhala',
+}
+
+
+# fonts.conf files already known to hold the right content: path -> (mtime_ns, size, content)
+_verified_fonts_conf: Dict[Path, Tuple[int, int, bytes]] = {}
+
+
+class ShapingSupport(NamedTuple):
+    """Text rendering libraries the installed FFmpeg was built with"""
+    ffmpeg_found: bool
+    libass: bool
+    fribidi: bool
+    freetype: bool
+    fontconfig: bool
+
+
+@functools.lru_cache(maxsize=1)
+def detect_ffmpeg_shaping() -> ShapingSupport:
+    """
+    Check which text rendering libraries the installed FFmpeg was built with
+    
+    The subtitles filter needs libass (which does the complex-script shaping
+    Sinhala relies on), and the watermark needs freetype. The flags are read
+    from get_ffmpeg_capabilities, whose probe is cached per process and on disk.
+    
+    Returns:
+        ShapingSupport tuple (immutable, so safe to share between callers)
+    """
+    caps = get_ffmpeg_capabilities()
+    # The configure flags come from the shared (disk-cached) `ffmpeg -version` probe
+    buildconf = caps['configuration']
+    return ShapingSupport(
+        ffmpeg_found=caps['available'],
+        libass='--enable-libass' in buildconf,
+        fribidi='--enable-libfribidi' in buildconf,
+        freetype='--enable-libfreetype' in buildconf,
+        fontconfig='--enable-fontconfig' in buildconf or '--enable-libfontconfig' in buildconf
+    )
+
+
+def list_font_directory(directory: Path) -> Mapping[str, str]:
+    """
+    Index the files in a font directory by lower-cased name
+    
+    One os.scandir sweep replaces a stat per candidate file, and lower-cased
+    keys let 'Bindumathi.TTF' match on case-sensitive filesystems too.
+    Listings are cached per directory modification time, so fonts copied in
+    later are still picked up.
+    
+    Args:
+        directory: Directory to list
+        
+    Returns:
+        Read-only mapping of lower-cased file name to actual file name
+        (empty if the directory does not exist)
+    """
+    try:
+        mtime_ns = directory.stat().st_mtime_ns
+    except OSError:
+        return types.MappingProxyType({})
+    return _list_font_directory(directory, mtime_ns)
+
+
+@functools.lru_cache(maxsize=16)
+def _list_font_directory(directory: Path, mtime_ns: int) -> Mapping[str, str]:
+    try:
+        with os.scandir(directory) as entries:
+            # is_file() uses the type scandir already returned on most platforms
+            index = {entry.name.lower(): entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        index = {}
+    return types.MappingProxyType(index)
+
+
+@functools.lru_cache(maxsize=1)
+def load_simdutf():
+    """Optional SIMD UTF-8 validator (pip install simdutf), imported on first use."""
+    try:
+        import simdutf
+    except ImportError:
+        return None
+    return simdutf
+
+
+def is_valid_utf8(data) -> bool:
+    """
+    Check whether raw bytes are valid UTF-8
+    
+    Uses simdutf's vectorized validator when it is installed, which also
+    avoids building a str; otherwise falls back to a plain decode.
+    
+    Args:
+        data: Raw file contents (bytes or any buffer, e.g. an mmap)
+        
+    Returns:
+        True if the bytes are valid UTF-8
+    """
+    simdutf = load_simdutf()
+    if simdutf is not None:
+        return simdutf.validate_utf8(data)
+    try:
+        str(data, 'utf-8')
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def parse_ratio(value: str) -> float:
+    """
+    Parse an ffprobe ratio such as r_frame_rate ("30000/1001") to a float
+    
+    Args:
+        value: Ratio string, optionally without a denominator
+        
+    Returns:
+        Ratio as float, or 0.0 if it is empty or has a zero denominator
+    """
+    num, _, den = (value or '').partition('/')
+    try:
+        numerator = int(num)
+        denominator = int(den) if den else 1
+    except ValueError:
+        return 0.0
+    return numerator / denominator if denominator else 0.0
+
+
+def srt_time_to_ass(timestamp: str) -> str:
+    """
+    Convert an SRT timestamp (HH:MM:SS,mmm) to ASS format (H:MM:SS.cc)
+    
+    Args:
+        timestamp: SRT timestamp string
+        
+    Returns:
+        ASS timestamp string
+    """
+    match = SRT_TIMESTAMP_RE.match(timestamp.strip())
+    if not match:
+        raise SubtitleError(f"Invalid SRT timestamp: {timestamp}")
+    
+    return format_ass_time(*match.groups())
+
+
+def format_ass_time(hours: str, minutes: str, seconds: str, millis: str) -> str:
+    """
+    Format SRT timestamp fields as an ASS timestamp (H:MM:SS.cc)
+    
+    Args:
+        hours, minutes, seconds, millis: Digit strings as captured from an SRT timestamp
+        
+    Returns:
+        ASS timestamp string
+    """
+    centiseconds = int(millis.ljust(3, '0')) // 10
+    return f"{int(hours)}:{int(minutes):02d}:{int(seconds):02d}.{centiseconds:02d}"
+
+
+def _srt_brace_to_ass(match: re.Match) -> str:
+    """Keep {\\anN}, drop other override blocks and escape stray braces."""
+    token = match.group()
+    if token in ASS_BRACE_ESCAPES:
+        return ASS_BRACE_ESCAPES[token]
+    return token if token.startswith('{\\an') else ''
+
+
+def _srt_tag_to_ass(match: re.Match) -> str:
+    """Map one HTML-style tag to its ASS override, or drop it."""
+    tag = match.group(2).lower()
+    overrides = SRT_TAG_REPLACEMENTS.get(tag)
+    if overrides is not None:
+        return overrides[1] if match.group(1) else overrides[0]
+    
+    if tag == 'font' or tag.startswith('font '):
+        if match.group(1):
+            return r'{\c}'  # Back to the style's colour
+        color = SRT_FONT_COLOR_RE.search(match.group(2))
+        if color:
+            # ASS colours are &HBBGGRR&
+            red, green, blue = color.groups()
+            return f'{{\\c&H{(blue + green + red).upper()}&}}'
+    
+    # Font faces/sizes and any other tags libass would render literally
+    return ''
+
+
+@functools.lru_cache(maxsize=4096)
+def escape_ass_text(text: str) -> str:
+    """
+    Convert SRT cue text into an ASS Dialogue text field
+    
+    {\\anN} positioning tags are kept, other {\\...} override blocks are
+    dropped and literal braces are escaped. SRT <i>/<b>/<u>/<s> tags and <font color>
+    become ASS override tags, any other HTML-style tags are dropped and line breaks
+    become ASS hard breaks. Results are memoized: auto-generated (rolling)
+    captions repeat each line across consecutive cues.
+    
+    Args:
+        text: Cue text from an SRT block
+        
+    Returns:
+        Text safe to place in a Dialogue line
+    """
+    if '{' in text or '}' in text:
+        text = SRT_BRACE_RE.sub(_srt_brace_to_ass, text)
+    
+    # Most cues carry no markup; the substring check is far cheaper than a regex scan
+    if '<' in text:
+        # One pass converts formatting tags and drops everything else
+        text = HTML_TAG_RE.sub(_srt_tag_to_ass, text)
+    
+    return NEWLINE_RE.sub(r'\\N', text)
+
+
+@dataclass
+class BurnContext:
+    """Per-subtitle hard-burn setup shared by every video burned with that subtitle"""
+    ass_path: Path
+    combined_filter: str
+    fonts_conf: Path
+    env: Dict[str, str]
 
 
 class SubtitleProcessor:
@@ -19,6 +344,26 @@ class SubtitleProcessor:
         self.soft_subtitle = SUBTITLE_CONFIG['soft_subtitle']
         self.subtitle_codec = SUBTITLE_CONFIG['subtitle_codec']
         self.burn_style = SUBTITLE_CONFIG['burn_style']
+        # ffprobe results keyed by (path, size, mtime)
+        self._probe_cache: Dict[Tuple[str, int, float], Dict] = {}
+        # Resolved Sinhala font path and its family, set once a font file is found
+        self._sinhala_font: Optional[str] = None
+        self._sinhala_font_family: Optional[str] = None
+        # Resolve working directories once so later path handling needs no getcwd calls
+        self.fonts_dir = self._resolve_dir('fonts', 'Fonts')
+        self.temp_dir = self._resolve_dir('temp', 'temp')
+
+    @property
+    def shaping_support(self) -> ShapingSupport:
+        """FFmpeg text rendering support, probed on first use (soft-only jobs never need it)."""
+        return detect_ffmpeg_shaping()
+
+    def _resolve_dir(self, key: str, default: str) -> Path:
+        """Absolute path of a configured directory, falling back to a relative default."""
+        directory = DIRS.get(key, Path(default))
+        if not isinstance(directory, Path):
+            directory = Path(default)
+        return directory.resolve()
 
     def _escape_ffmpeg_filter_path(self, path: Path) -> str:
         """Escape a filesystem path for use inside an FFmpeg filter argument.
@@ -26,23 +371,20 @@ class SubtitleProcessor:
         FFmpeg filter syntax treats ':' and '\\' specially on Windows paths.
         Using forward slashes + escaping ':' is the most reliable approach.
         """
-        # Forward slashes for FFmpeg
-        p = str(path.absolute()).replace('\\', '/')
-        # Escape the drive letter colon (and any other colons)
-        p = p.replace(':', r'\:')
-        # Escape single quotes for FFmpeg filter single-quoted strings
-        p = p.replace("'", r"\'")
-        return p
+        if not path.is_absolute():
+            path = path.absolute()
+        return str(path).translate(FFMPEG_FILTER_PATH_TABLE)
 
     def _get_preferred_unicode_font_name(self) -> str:
-        """Pick a font family name that supports Sinhala/Unicode."""
-        project_fonts = DIRS.get('fonts', Path('Fonts'))
-        if not isinstance(project_fonts, Path):
-            project_fonts = Path('Fonts')
-
-        # Prefer fonts we ship with the repo for predictable rendering
-        if (project_fonts / 'NotoSansSinhala-Regular.ttf').exists() or (project_fonts / 'NotoSansSinhala.ttf').exists():
-            return 'Noto Sans Sinhala'
+        """Pick a font family name that supports Sinhala/Unicode.
+
+        The name matches the font file resolved by find_sinhala_font, so libass
+        finds it in fontsdir instead of falling back to a different font.
+        """
+        self.find_sinhala_font()
+        # Only set once a font file was actually found
+        if self._sinhala_font_family is not None:
+            return self._sinhala_font_family
         # Fall back to configured list
         for font_name in SUBTITLE_CONFIG.get('unicode_fonts', []):
             if font_name:
@@ -50,11 +392,96 @@ class SubtitleProcessor:
 
         return self.burn_style.get('font_name', 'DejaVu Sans')
 
+    def _get_burn_tuning_args(self, video_info: Dict) -> list:
+        """Build single-pass x264 tuning arguments for the hard-burn encode.
+
+        Subtitle burning overlays static text on natural video, so a low
+        reference count and short lookahead cost little quality but save
+        a large share of encode time.
+        """
+        if FFMPEG_CONFIG['video_codec'] != 'libx264':
+            return []
+
+        x264_params = FFMPEG_CONFIG['burn_x264_params']
+        fps = video_info.get('fps', 0)
+        if 0 < fps <= 30:
+            x264_params = f"{x264_params}:{FFMPEG_CONFIG['burn_low_fps_keyint']}"
+
+        return ['-tune', FFMPEG_CONFIG['burn_tune'], '-x264-params', x264_params]
+
+    def _get_burn_video_args(self, preset: str, crf: int, threads: int, video_info: Dict) -> list:
+        """Video encoder arguments for the hard burn, preferring a working GPU encoder.
+
+        Decoding and the subtitles filter stay on the CPU (libass renders there
+        anyway); only the encode, the expensive part, moves to the GPU.
+        """
+        hw_encoder = get_hardware_encoder()
+        if hw_encoder == 'h264_nvenc':
+            return ['-c:v', 'h264_nvenc', '-preset', 'p5', '-rc', 'vbr', '-cq', str(crf), '-b:v', '0',
+                    '-pix_fmt', 'yuv420p']
+        if hw_encoder == 'h264_qsv':
+            return ['-c:v', 'h264_qsv', '-preset', 'medium', '-global_quality', str(crf), '-pix_fmt', 'nv12']
+
+        args = ['-c:v', FFMPEG_CONFIG['video_codec'], '-crf', str(crf), '-preset', preset]
+        args.extend(self._get_burn_tuning_args(video_info))
+        args.extend(['-threads', str(threads)])
+        return args
+
+    def _get_burn_audio_args(self, video_info: Dict) -> list:
+        """Copy the audio track when MP4 can hold it as-is, otherwise re-encode to AAC."""
+        audio_codec = video_info.get('audio_codec')
+        if audio_codec is None or audio_codec in MP4_COPY_AUDIO_CODECS:
+            return ['-c:a', 'copy']
+        logger.info(f"Audio codec '{audio_codec}' cannot be copied into MP4, re-encoding to AAC")
+        return ['-c:a', 'aac', '-b:a', '192k']
+
+    def _get_burn_encoder_settings(self, low_memory: bool) -> Tuple[str, int, int]:
+        """Return (preset, crf, threads) for the hard-burn encode."""
+        if low_memory:
+            # Faster preset, higher CRF and fewer threads keep memory down
+            return 'veryfast', 28, 2
+        threads = min(os.cpu_count() or 4, FFMPEG_CONFIG['burn_max_threads'])
+        return FFMPEG_CONFIG['preset'], FFMPEG_CONFIG['crf'], threads
+
+    def _build_burn_filter(self, ass_path: Path, font_dir: Path) -> str:
+        """Build the subtitles + watermark filter chain for one hard-burn input.
+
+        fontsdir points at the directory of the resolved Sinhala font so libass
+        loads the same font the ASS style names without a fontconfig scan.
+        """
+        # Font for the watermark shown during the first 10 seconds
+        arial_path = self.fonts_dir / 'arial.ttf'
+        if arial_path.exists():
+            arial_font = str(arial_path).replace('\\', '\\\\\\\\').replace(':', '\\\\:')
+        else:
+            arial_font = 'C\\\\\\\\:/Windows/Fonts/arial.ttf'
+        watermark_filter = WATERMARK_FILTER_TEMPLATE.format(text=WATERMARK_TEXT, font=arial_font)
+
+        subtitle_filter = SUBTITLE_FILTER_TEMPLATE.format(
+            subtitle=self._escape_ffmpeg_filter_path(ass_path),
+            fonts_dir=self._escape_ffmpeg_filter_path(font_dir)
+        )
+
+        return f"{subtitle_filter},{watermark_filter}"
+
+    def _get_fontconfig_env(self, fonts_conf_path: Path) -> Dict[str, str]:
+        """Copy of the process environment pointing fontconfig at our fonts.conf."""
+        env = os.environ.copy()
+        if not fonts_conf_path.is_absolute():
+            fonts_conf_path = fonts_conf_path.absolute()
+        env['FONTCONFIG_FILE'] = str(fonts_conf_path)
+        env['FONTCONFIG_PATH'] = str(fonts_conf_path.parent)
+        return env
+
     def ensure_ass_subtitle(self, subtitle_path: Path) -> Path:
         """Ensure a subtitle file is in ASS format for reliable hard-burn rendering.
 
         Sinhala (and many complex scripts) tend to render more consistently via ASS/libass,
         and converting avoids edge cases with SRT parsing/encoding.
+
+        Converted files are cached in the temp directory, keyed by a hash of the
+        subtitle content, the style font and the converter version, so repeat burns of the same subtitle
+        reuse the existing ASS file.
         """
         suffix = subtitle_path.suffix.lower()
         if suffix in {'.ass', '.ssa'}:
@@ -68,49 +495,119 @@ class SubtitleProcessor:
         # Normalize encoding first (so FFmpeg reads consistent UTF-8)
         self.validate_subtitle_file(subtitle_path)
 
-        output_dir = DIRS.get('temp', Path('temp'))
-        if not isinstance(output_dir, Path):
-            output_dir = Path('temp')
+        output_dir = self.temp_dir
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        ass_path = output_dir / f"{subtitle_path.stem}_converted.ass"
+        font_name = self._get_preferred_unicode_font_name()
+        cache_key = hashlib.blake2b(
+            subtitle_path.read_bytes() + font_name.encode('utf-8') + b'24' + SRT_TO_ASS_VERSION,
+            digest_size=8
+        ).hexdigest()
+        ass_path = output_dir / f"{subtitle_path.stem}_converted_{cache_key}.ass"
 
-        logger.info(f"Converting subtitle to ASS for hard burn: {subtitle_path.name} -> {ass_path.name}")
+        if ass_path.exists() and ass_path.stat().st_size > 0:
+            logger.info(f"Reusing converted ASS subtitle: {ass_path.name}")
+            return ass_path
 
-        # FFmpeg can convert SRT/VTT/etc. into ASS directly.
-        # Use -sub_charenc to force UTF-8 decoding for text-based inputs.
-        cmd = [
-            'ffmpeg',
-            '-sub_charenc', 'UTF-8',
-            '-i', str(subtitle_path),
-            '-c:s', 'ass',
-            '-y',
-            str(ass_path)
-        ]
+        logger.info(f"Converting subtitle to ASS for hard burn: {subtitle_path.name} -> {ass_path.name}")
 
+        # Convert into a temporary file so an interrupted run never leaves a cached partial ASS.
+        # The name is unique per call: concurrent jobs burning the same subtitle share ass_path
+        fd, partial_name = tempfile.mkstemp(dir=output_dir, prefix=f"{ass_path.stem}.", suffix='.part')
+        os.close(fd)
+        partial_path = Path(partial_name)
         try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-        except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg subtitle conversion stderr: {e.stderr}")
-            raise SubtitleError(f"Failed to convert subtitle to ASS: {e.stderr}")
+            if suffix == '.srt':
+                # SRT -> ASS is a pure text transformation; no need to fork FFmpeg
+                self.convert_srt_to_ass(subtitle_path, partial_path, font_name)
+                partial_path.replace(ass_path)
+                return ass_path
 
-        if not ass_path.exists() or ass_path.stat().st_size == 0:
-            raise SubtitleError("ASS subtitle conversion failed (output not created)")
+            # FFmpeg can convert VTT/SUB/etc. into ASS directly.
+            # Use -sub_charenc to force UTF-8 decoding for text-based inputs.
+            cmd = [
+                'ffmpeg',
+                '-sub_charenc', 'UTF-8',
+                '-i', str(subtitle_path),
+                '-c:s', 'ass',
+                '-f', 'ass',
+                '-y',
+                str(partial_path)
+            ]
+
+            # Only stderr is needed, and only when the conversion fails
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                stderr = result.stderr.decode('utf-8', 'replace')
+                logger.error(f"FFmpeg subtitle conversion stderr: {stderr}")
+                raise SubtitleError(f"Failed to convert subtitle to ASS: {stderr}")
 
-        # Ensure the converted ASS explicitly uses a Sinhala-capable font in its style.
-        self.inject_font_into_ass(ass_path)
+            if partial_path.stat().st_size == 0:
+                raise SubtitleError("ASS subtitle conversion failed (output not created)")
+
+            # Ensure the converted ASS explicitly uses a Sinhala-capable font in its style.
+            self.inject_font_into_ass(partial_path, font_name)
+            partial_path.replace(ass_path)
+        finally:
+            # Only left behind when the conversion failed
+            partial_path.unlink(missing_ok=True)
+
+        return ass_path
 
+    def convert_srt_to_ass(self, srt_path: Path, ass_path: Path, font_name: Optional[str] = None) -> Path:
+        """
+        Convert an SRT file to ASS with the Sinhala Default style
+        
+        Args:
+            srt_path: Path to UTF-8 SRT file
+            ass_path: Path to write the ASS file to
+            font_name: Font family for the Default style (default: resolved Sinhala font)
+            
+        Returns:
+            Path to the ASS file
+        """
+        if font_name is None:
+            font_name = self._get_preferred_unicode_font_name()
+        
+        content = srt_path.read_text(encoding='utf-8-sig').replace('\r\n', '\n')
+        
+        header = ASS_SCRIPT_HEADER_TEMPLATE.format(font_name=font_name, play_res_x=384, play_res_y=288)
+        
+        # Dialogue lines are streamed out as they are parsed; the 1 MiB buffer
+        # batches them into few write calls without holding every event in memory
+        event_count = 0
+        with open(ass_path, 'w', encoding='utf-8', buffering=1 << 20) as fh:
+            fh.write(header)
+            for match in SRT_CUE_RE.finditer(content):
+                text = match.group(9).strip()
+                if not text:
+                    continue
+                
+                start = format_ass_time(*match.group(1, 2, 3, 4))
+                end = format_ass_time(*match.group(5, 6, 7, 8))
+                fh.write(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{escape_ass_text(text)}\n")
+                event_count += 1
+        
+        if not event_count:
+            ass_path.unlink()
+            raise SubtitleError(f"No subtitle events found in {srt_path.name}")
+        
+        logger.info(f"Converted {event_count} subtitle events to ASS with font '{font_name}'")
         return ass_path
 
-    def inject_font_into_ass(self, ass_path: Path, font_name: str = 'bindumathi') -> None:
+    def inject_font_into_ass(self, ass_path: Path, font_name: Optional[str] = None) -> None:
         """Inject/update the Default ASS style to use a Sinhala-capable font.
 
         Creates a proper ASS file with complete style fields for Sinhala rendering.
-        Uses 'bindumathi' as default font name since bindumathi.ttf exists in Fonts folder.
+        Defaults to the family of the font file found by find_sinhala_font.
         """
         if not ass_path.exists() or ass_path.stat().st_size == 0:
             raise SubtitleError(f"ASS file not found or empty: {ass_path}")
 
+        if font_name is None:
+            font_name = self._get_preferred_unicode_font_name()
+        default_style_line = ASS_DEFAULT_STYLE_TEMPLATE.format(font_name=font_name)
+
         content = ass_path.read_text(encoding='utf-8', errors='strict')
         
         # Check if we have V4+ Styles section
@@ -142,8 +639,8 @@ class SubtitleProcessor:
                 # If entering styles section and no format yet, add proper format
                 if in_styles and not has_styles_section:
                     # Add complete ASS style format
-                    output_lines.append('Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n')
-                    output_lines.append(f'Style: Default,{font_name},24,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,0,2,20,20,30,1\n')
+                    output_lines.append(ASS_STYLE_FORMAT_LINE)
+                    output_lines.append(default_style_line)
                     format_found = True
                     style_updated = True
                 continue
@@ -156,12 +653,11 @@ class SubtitleProcessor:
                     format_found = True
                     
                     # Ensure format has all required fields
-                    required_fields = ['Name', 'Fontname', 'Fontsize', 'PrimaryColour', 'SecondaryColour', 'OutlineColour', 'BackColour', 'Bold', 'Italic', 'Underline', 'StrikeOut', 'ScaleX', 'ScaleY', 'Spacing', 'Angle', 'BorderStyle', 'Outline', 'Shadow', 'Alignment', 'MarginL', 'MarginR', 'MarginV', 'Encoding']
-                    if len(format_fields) < len(required_fields):
+                    if len(format_fields) < len(ASS_STYLE_FIELDS):
                         # Replace with complete format
-                        output_lines.append('Format: ' + ', '.join(required_fields) + '\n')
+                        output_lines.append(ASS_STYLE_FORMAT_LINE)
                         # Update index
-                        format_fields = required_fields
+                        format_fields = ASS_STYLE_FIELDS
                         format_index = {normalize_field(name): idx for idx, name in enumerate(format_fields)}
                     else:
                         output_lines.append(line)
@@ -175,8 +671,7 @@ class SubtitleProcessor:
                     # If incomplete style, create complete one
                     if len(parts) < 22:  # Standard ASS has 23 fields
                         # Create complete style with all fields
-                        style_line = f'Style: Default,{font_name},24,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,0,2,20,20,30,1\n'
-                        output_lines.append(style_line)
+                        output_lines.append(default_style_line)
                         style_updated = True
                         continue
 
@@ -243,8 +738,8 @@ class SubtitleProcessor:
                 if line.strip().lower() == '[events]':
                     # Insert styles section before events
                     final_output.append('[V4+ Styles]\n')
-                    final_output.append('Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n')
-                    final_output.append(f'Style: Default,{font_name},24,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,0,2,20,20,30,1\n')
+                    final_output.append(ASS_STYLE_FORMAT_LINE)
+                    final_output.append(default_style_line)
                     final_output.append('\n')
                 final_output.append(line)
             output_lines = final_output
@@ -257,22 +752,21 @@ class SubtitleProcessor:
         Create a fontconfig file (fonts.conf) that tells libass where to find Sinhala fonts.
         This is critical for proper Sinhala rendering in hard-burned subtitles.
         
+        The file is only rewritten when its content would change, and then via an
+        atomic rename so a concurrent burn never reads a half-written file.
+        
         Returns:
             Path to created fonts.conf file
         """
-        project_fonts = DIRS.get('fonts', Path('Fonts'))
-        if not isinstance(project_fonts, Path):
-            project_fonts = Path('Fonts')
+        project_fonts = self.fonts_dir
         
-        temp_dir = DIRS.get('temp', Path('temp'))
-        if not isinstance(temp_dir, Path):
-            temp_dir = Path('temp')
+        temp_dir = self.temp_dir
         temp_dir.mkdir(exist_ok=True)
         
         fonts_conf_path = temp_dir / 'fonts.conf'
         
         # Absolute path to fonts directory (needed for fontconfig)
-        fonts_abs_path = str(project_fonts.absolute()).replace('\\', '/')
+        fonts_abs_path = str(project_fonts).replace('\\', '/')
         
         # Create fontconfig XML that points to our Fonts directory
         fontconfig_xml = f'''<?xml version="1.0"?>
@@ -342,7 +836,23 @@ class SubtitleProcessor:
 </fontconfig>
 '''
         
-        fonts_conf_path.write_text(fontconfig_xml, encoding='utf-8')
+        desired = fontconfig_xml.encode('utf-8')
+        try:
+            stat = fonts_conf_path.stat()
+            # Same mtime and size as a file we already compared: skip reading it again
+            if _verified_fonts_conf.get(fonts_conf_path) == (stat.st_mtime_ns, stat.st_size, desired):
+                return fonts_conf_path
+            if fonts_conf_path.read_bytes() == desired:
+                _verified_fonts_conf[fonts_conf_path] = (stat.st_mtime_ns, stat.st_size, desired)
+                return fonts_conf_path
+        except FileNotFoundError:
+            pass
+        
+        partial_path = fonts_conf_path.with_name(f"fonts.conf.{os.getpid()}.{threading.get_ident()}.part")
+        partial_path.write_bytes(desired)
+        partial_path.replace(fonts_conf_path)
+        stat = fonts_conf_path.stat()
+        _verified_fonts_conf[fonts_conf_path] = (stat.st_mtime_ns, stat.st_size, desired)
         logger.info(f"Created fontconfig file: {fonts_conf_path}")
         logger.info(f"Fontconfig points to fonts directory: {fonts_abs_path}")
         
@@ -352,49 +862,46 @@ class SubtitleProcessor:
         """
         Find available Sinhala font from project Fonts folder
         
+        A font that was found is remembered on the instance, so later calls
+        skip the filesystem probes.
+        
         Returns:
             Path to font file
         """
+        if self._sinhala_font is not None:
+            return self._sinhala_font
+        
         # Check project Fonts folder first (for deployment)
-        project_fonts = DIRS.get('fonts', Path('Fonts'))
-        if not isinstance(project_fonts, Path):
-            project_fonts = Path('Fonts')
+        project_fonts = self.fonts_dir
         
         # List of Sinhala fonts to try (in priority order)
         # bindumathi.ttf is prioritized as it's specifically for Sinhala
-        sinhala_fonts = [
-            'bindumathi.ttf',
-            'NotoSansSinhala-Regular.ttf',
-            'NotoSansSinhala.ttf',
-            'NotoSansSinhala-Bold.ttf',
-        ]
-        
-        # Check if fonts exist in project folder
-        if project_fonts.exists():
-            for font_file in sinhala_fonts:
-                font_path = project_fonts / font_file
-                if font_path.exists():
-                    logger.info(f"Found Sinhala font in project: {font_path}")
-                    return str(font_path.absolute())
-        
-        # Fallback: Check Windows fonts (for local development)
-        windows_fonts = Path(r'C:\Windows\Fonts')
-        if windows_fonts.exists():
+        sinhala_fonts = list(SINHALA_FONT_FAMILIES)
+        
+        # Project folder first (deployment), then Windows fonts (local development)
+        for location, fonts_dir in (('project', project_fonts), ('Windows', Path(r'C:\Windows\Fonts'))):
+            available = list_font_directory(fonts_dir)
             for font_file in sinhala_fonts:
-                font_path = windows_fonts / font_file
-                if font_path.exists():
-                    logger.info(f"Found Sinhala font in Windows: {font_path}")
-                    return str(font_path)
+                actual_name = available.get(font_file.lower())
+                if actual_name is not None:
+                    font_path = fonts_dir / actual_name
+                    logger.info(f"Found Sinhala font in {location}: {font_path}")
+                    self._sinhala_font_family = SINHALA_FONT_FAMILIES[font_file]
+                    self._sinhala_font = str(font_path)
+                    return self._sinhala_font
         
         # Last resort: use project font path even if not verified
         fallback_path = project_fonts / 'bindumathi.ttf'
         logger.warning(f"Font not verified, using fallback path: {fallback_path}")
-        return str(fallback_path.absolute())
+        return str(fallback_path)
     
     def get_video_info(self, video_path: Path) -> Dict:
         """
         Get video metadata using ffprobe
         
+        Results are cached per (path, size, mtime), so probing the same
+        unchanged file again does not spawn another ffprobe.
+        
         Args:
             video_path: Path to video file
             
@@ -402,12 +909,30 @@ class SubtitleProcessor:
             Dictionary with video information
         """
         try:
+            stat = video_path.stat()
+            cache_key = (str(video_path), stat.st_size, stat.st_mtime)
+        except OSError:
+            cache_key = None
+        
+        if cache_key is not None and cache_key in self._probe_cache:
+            return self._probe_cache[cache_key]
+        
+        video_info = self._probe_video_info(video_path)
+        if cache_key is not None:
+            self._probe_cache[cache_key] = video_info
+        return video_info
+    
+    def _probe_video_info(self, video_path: Path) -> Dict:
+        """Run ffprobe and extract the fields get_video_info returns."""
+        try:
+            # Only ask for the fields we read; codec_type is needed to pick
+            # the video and audio streams out of the stream list
             cmd = [
                 'ffprobe',
                 '-v', 'quiet',
                 '-print_format', 'json',
-                '-show_format',
-                '-show_streams',
+                '-show_entries',
+                'stream=codec_type,codec_name,width,height,r_frame_rate:format=duration,bit_rate',
                 str(video_path)
             ]
             
@@ -429,13 +954,19 @@ class SubtitleProcessor:
             if not video_stream:
                 raise SubtitleError("No video stream found")
             
+            audio_stream = next(
+                (s for s in info['streams'] if s['codec_type'] == 'audio'),
+                None
+            )
+            
             return {
                 'width': int(video_stream.get('width', 0)),
                 'height': int(video_stream.get('height', 0)),
                 'duration': float(info['format'].get('duration', 0)),
                 'bit_rate': int(info['format'].get('bit_rate', 0)),
                 'codec': video_stream.get('codec_name', 'unknown'),
-                'fps': eval(video_stream.get('r_frame_rate', '0/1'))
+                'fps': parse_ratio(video_stream.get('r_frame_rate', '0/1')),
+                'audio_codec': audio_stream.get('codec_name') if audio_stream else None
             }
             
         except subprocess.CalledProcessError as e:
@@ -460,28 +991,62 @@ class SubtitleProcessor:
         if subtitle_path.stat().st_size == 0:
             raise SubtitleError(f"Subtitle file is empty: {subtitle_path}")
         
-        # Ensure subtitle file is UTF-8 encoded
-        try:
-            content = subtitle_path.read_text(encoding='utf-8')
-            # If we can read it as UTF-8, re-write to ensure BOM-free UTF-8
-            subtitle_path.write_text(content, encoding='utf-8')
-            logger.info(f"Subtitle file validated and ensured UTF-8: {subtitle_path}")
-        except UnicodeDecodeError:
-            # Try to read with different encodings and convert to UTF-8
+        # Common case: already BOM-free UTF-8, so leave the file (and its mtime) alone.
+        # Validate through a read-only mmap so large files are not copied into memory.
+        with open(subtitle_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            has_bom = mm[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8
+            if not has_bom and is_valid_utf8(mm):
+                logger.info(f"Subtitle file validated as UTF-8: {subtitle_path}")
+                return True
+        
+        if not has_bom:
             logger.warning("Subtitle file is not UTF-8, attempting to convert...")
-            for encoding in ['utf-8-sig', 'utf-16', 'utf-16-le', 'utf-16-be', 'cp1252', 'latin-1', 'iso-8859-1']:
-                try:
-                    content = subtitle_path.read_text(encoding=encoding)
-                    subtitle_path.write_text(content, encoding='utf-8')
-                    logger.info(f"Converted subtitle from {encoding} to UTF-8")
-                    break
-                except:
-                    continue
-            else:
-                raise SubtitleError("Could not decode subtitle file with any known encoding")
+        
+        # Rewrite as BOM-free UTF-8
+        content, encoding = self._decode_subtitle_bytes(subtitle_path.read_bytes())
+        subtitle_path.write_bytes(content.encode('utf-8'))
+        logger.info(f"Converted subtitle from {encoding} to UTF-8")
         
         return True
     
+    def _decode_subtitle_bytes(self, raw: bytes) -> Tuple[str, str]:
+        """
+        Decode subtitle bytes that are not plain UTF-8
+        
+        A UTF-8 BOM is handled directly. Otherwise charset-normalizer (installed
+        alongside requests) detects the encoding in one pass; the trial-decode
+        cascade is only used when it is unavailable or has no answer.
+        
+        Args:
+            raw: Raw subtitle file contents
+            
+        Returns:
+            Tuple of (decoded text, encoding name)
+        """
+        if raw.startswith(codecs.BOM_UTF8):
+            try:
+                return raw.decode('utf-8-sig'), 'utf-8-sig'
+            except UnicodeDecodeError:
+                pass
+        
+        try:
+            from charset_normalizer import from_bytes
+        except ImportError:
+            from_bytes = None
+        
+        if from_bytes is not None:
+            best = from_bytes(raw).best()
+            if best is not None:
+                return str(best), best.encoding
+        
+        for encoding in ['utf-8-sig', 'utf-16', 'utf-16-le', 'utf-16-be', 'cp1252', 'latin-1', 'iso-8859-1']:
+            try:
+                return raw.decode(encoding), encoding
+            except UnicodeError:
+                continue
+        
+        raise SubtitleError("Could not decode subtitle file with any known encoding")
+    
     def embed_soft_subtitle(
         self,
         video_path: Path,
@@ -509,8 +1074,11 @@ class SubtitleProcessor:
         try:
             # FFmpeg command for soft subtitle embedding with UTF-8 support
             # -sub_charenc utf-8 ensures proper Unicode/Sinhala character handling
+            # Only errors reach stderr, so the captured pipe stays small
             cmd = [
                 'ffmpeg',
+                '-nostats',
+                '-loglevel', 'error',
                 '-sub_charenc', 'utf-8',  # Force UTF-8 encoding for subtitles
                 '-i', str(video_path),
                 '-i', str(subtitle_path),
@@ -524,12 +1092,13 @@ class SubtitleProcessor:
                 str(output_path)
             ]
             
-            logger.debug(f"FFmpeg command: {' '.join(cmd)}")
+            if logger.is_enabled_for(logging.DEBUG):
+                logger.debug(f"FFmpeg command: {shlex.join(cmd)}")
             
-            result = subprocess.run(
+            subprocess.run(
                 cmd,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 check=True
             )
             
@@ -540,8 +1109,42 @@ class SubtitleProcessor:
                 raise SubtitleError("Output file was not created")
                 
         except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg stderr: {e.stderr}")
-            raise SubtitleError(f"Failed to embed soft subtitles: {e.stderr}")
+            stderr = e.stderr.decode('utf-8', 'replace') if e.stderr else ''
+            logger.error(f"FFmpeg stderr: {stderr}")
+            raise SubtitleError(f"Failed to embed soft subtitles: {stderr}")
+    
+    def _prepare_burn_context(self, subtitle_path: Path) -> 'BurnContext':
+        """
+        Do the per-subtitle setup of a hard burn once
+        
+        Args:
+            subtitle_path: Path to subtitle file
+            
+        Returns:
+            BurnContext that can be reused for every video burned with this subtitle
+        """
+        # Ensure text encoding is normalized and convert SRT->ASS for consistent Unicode shaping
+        ass_path = self.ensure_ass_subtitle(subtitle_path)
+        
+        # Create fontconfig file so libass can find Sinhala fonts
+        fonts_conf_path = self.create_fontconfig_file()
+        
+        # Get the actual font file path for direct loading
+        font_file_path = self.find_sinhala_font()
+        font_dir = Path(font_file_path).parent
+        
+        logger.info(f"Using fontconfig: {fonts_conf_path}")
+        logger.info(f"Font directory: {font_dir}")
+        logger.info(f"Font file: {font_file_path}")
+        
+        return BurnContext(
+            ass_path=ass_path,
+            # Subtitles + watermark (watermark only shows for first 10 seconds)
+            combined_filter=self._build_burn_filter(ass_path, font_dir),
+            fonts_conf=fonts_conf_path,
+            # Set FONTCONFIG environment variables for libass
+            env=self._get_fontconfig_env(fonts_conf_path)
+        )
     
     def embed_hard_subtitle(
         self,
@@ -549,7 +1152,9 @@ class SubtitleProcessor:
         subtitle_path: Path,
         output_path: Optional[Path] = None,
         progress_callback=None,
-        cancel_check=None
+        cancel_check=None,
+        video_info: Optional[Dict] = None,
+        burn_context: Optional['BurnContext'] = None
     ) -> Path:
         """
         Burn subtitle permanently into video frames (hard subtitle)
@@ -561,14 +1166,19 @@ class SubtitleProcessor:
             output_path: Optional output path
             progress_callback: Function(current_seconds, total_seconds) for progress
             cancel_check: Optional function() -> bool to check for cancellation
+            video_info: Optional result of get_video_info, to skip probing again
+            burn_context: Optional result of _prepare_burn_context, shared between videos
             
         Returns:
             Path to output video with burned subtitles
         """
         logger.info("Burning hard subtitles into video...")
         
-        # Ensure text encoding is normalized and convert SRT->ASS for consistent Unicode shaping
-        subtitle_path_for_burn = self.ensure_ass_subtitle(subtitle_path)
+        if not self.shaping_support.libass:
+            logger.warning("FFmpeg does not report libass support; subtitle burning will likely fail")
+        
+        if burn_context is None:
+            burn_context = self._prepare_burn_context(subtitle_path)
         
         if not output_path:
             output_path = DIRS['processing'] / f"{video_path.stem}_hardsubbed.mp4"
@@ -578,135 +1188,119 @@ class SubtitleProcessor:
         low_memory = PROCESSING_CONFIG.get('low_memory_mode', False)
         
         try:
-            # Escape subtitle path for FFmpeg filter
-            # Windows paths need special handling
-            subtitle_filter_path = str(subtitle_path_for_burn).replace('\\', '/').replace(':', '\\\\:')
-            
             # Memory-optimized settings for cloud environments
             if low_memory:
                 logger.info("Using low-memory optimization for cloud environment")
-                preset = 'veryfast'  # Faster, less memory
-                crf = 28  # Higher CRF = lower quality but much less memory
-                threads = 2  # Limit threads to reduce memory
-            else:
-                preset = FFMPEG_CONFIG['preset']
-                crf = FFMPEG_CONFIG['crf']
-                threads = 0  # Auto
-            
-            # Get project fonts directory
-            project_fonts = DIRS.get('fonts', Path('Fonts'))
-            if not isinstance(project_fonts, Path):
-                project_fonts = Path('Fonts')
-            
-            # Create complex filter with subtitles + watermark text for first 10 seconds
-            watermark_text = "This is MovieDownloadSL..."
-            arial_path = project_fonts / 'arial.ttf'
-            if arial_path.exists():
-                arial_font = str(arial_path.absolute()).replace('\\', '\\\\\\\\').replace(':', '\\\\:')
+            preset, crf, threads = self._get_burn_encoder_settings(low_memory)
+            hw_encoder = get_hardware_encoder()
+            if hw_encoder:
+                logger.info(f"Using hardware encoder for hard burn: {hw_encoder}")
             else:
-                arial_font = 'C\\\\\\\\:/Windows/Fonts/arial.ttf'
-            watermark_filter = f"drawtext=text='{watermark_text}':fontfile={arial_font}:fontsize=24:fontcolor=white:borderw=2:bordercolor=black:x=(w-text_w)/2:y=30:enable='lt(t,10)'"
-            
-            # Create fontconfig file so libass can find Sinhala fonts
-            fonts_conf_path = self.create_fontconfig_file()
-            
-            # Get the actual font file path for direct loading
-            font_file_path = self.find_sinhala_font()
-            font_file_escaped = self._escape_ffmpeg_filter_path(Path(font_file_path))
-            
-            # Subtitle filter with explicit font loading
-            subtitle_file_escaped = self._escape_ffmpeg_filter_path(subtitle_path_for_burn)
-
-            # Critical for Sinhala: Use subtitles filter with explicit fontsdir parameter
-            # This ensures libass loads fonts from our Fonts folder
-            project_fonts = DIRS.get('fonts', Path('Fonts'))
-            if not isinstance(project_fonts, Path):
-                project_fonts = Path('Fonts')
-            fonts_dir_escaped = self._escape_ffmpeg_filter_path(project_fonts)
-            
-            # Build subtitle filter with font directory
-            subtitle_filter = f"subtitles=filename='{subtitle_file_escaped}':fontsdir='{fonts_dir_escaped}':charenc=UTF-8"
-            
-            # Combine both filters: subtitles + watermark (watermark only shows for first 10 seconds)
-            combined_filter = f"{subtitle_filter},{watermark_filter}"
-            
-            # Set FONTCONFIG environment variables for libass
-            env = os.environ.copy()
-            env['FONTCONFIG_FILE'] = str(fonts_conf_path.absolute())
-            env['FONTCONFIG_PATH'] = str(fonts_conf_path.parent.absolute())
+                logger.info(f"Hard-burn encoder threads: {threads}")
             
-            logger.info(f"Using fontconfig: {fonts_conf_path}")
-            logger.info(f"Font directory: {project_fonts.absolute()}")
-            logger.info(f"Font file: {font_file_path}")
+            # Get video info for progress calculation and encoder tuning
+            if video_info is None:
+                video_info = self.get_video_info(video_path)
+            total_duration = video_info.get('duration', 0)
             
             # FFmpeg command for hard subtitle burning with Unicode support + watermark
+            # Progress goes to stdout as key=value lines; stderr only carries errors
             cmd = [
                 'ffmpeg',
+                '-progress', 'pipe:1',
+                '-nostats',
+                '-loglevel', 'error',
                 '-i', str(video_path),
-                '-vf', combined_filter,
-                '-c:v', FFMPEG_CONFIG['video_codec'],
-                '-crf', str(crf),
-                '-preset', preset,
-                '-threads', str(threads),
-                '-c:a', 'copy',  # Copy audio stream
+                '-vf', burn_context.combined_filter,
+            ]
+            cmd.extend(self._get_burn_video_args(preset, crf, threads, video_info))
+            cmd.extend(self._get_burn_audio_args(video_info))
+            cmd.extend([
                 '-max_muxing_queue_size', '1024',  # Prevent memory overflow
                 '-y',  # Overwrite output
                 str(output_path)
-            ]
+            ])
             
-            logger.debug(f"FFmpeg command: {' '.join(cmd)}")
+            if logger.is_enabled_for(logging.DEBUG):
+                logger.debug(f"FFmpeg command: {shlex.join(cmd)}")
             logger.warning("GÜán+Å HARD SUBTITLE BURNING IS VERY SLOW (10-30 min)!")
             logger.warning("=ƒÆí For production, use SOFT SUBTITLES (takes <1 minute)")
             logger.info("Processing every video frame with subtitle overlay...")
             
-            # Get video duration for progress calculation
-            video_info = self.get_video_info(video_path)
-            total_duration = video_info.get('duration', 0)
-            
             # Run with progress output and fontconfig environment
+            # Binary pipes: progress lines are ASCII, so skip per-line text decoding
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                universal_newlines=True,
-                env=env  # Use environment with FONTCONFIG settings
+                stderr=subprocess.PIPE,
+                bufsize=0,
+                env=burn_context.env  # Use environment with FONTCONFIG settings
             )
+            # Drained alongside stdout: undecodable input can log an error per packet
+            stderr_tail = StderrTail(process.stderr)
             
-            # Monitor progress with FFmpeg output parsing and cancellation check
-            import re
-            import time
-            for line in process.stdout:
+            # Monitor the -progress stream in bulk reads and check for cancellation
+            stdout_fd = process.stdout.fileno()
+            out_time_key = PROGRESS_OUT_TIME_KEY
+            out_time_offset = len(out_time_key)
+            has_duration = total_duration > 0
+            last_logged_decile = -1
+            pending = b''
+            while True:
+                chunk = os.read(stdout_fd, PROGRESS_READ_SIZE)
+                if not chunk:
+                    break
+                
                 # Check for cancellation
                 if cancel_check and cancel_check():
                     logger.warning("Cancelling hard subtitle burning...")
                     process.terminate()
-                    time.sleep(0.5)
-                    if process.poll() is None:  # Still running
+                    try:
+                        process.wait(timeout=0.5)  # Returns as soon as FFmpeg exits
+                    except subprocess.TimeoutExpired:  # Still running
                         process.kill()
+                        process.wait()
                     # Delete partial output file
                     if output_path.exists():
                         output_path.unlink()
                     raise SubtitleError("Hard subtitle burning cancelled by user")
                 
-                if 'time=' in line:
-                    # Parse FFmpeg progress: time=00:01:23.45
-                    time_match = re.search(r'time=(\d{2}):(\d{2}):(\d{2}\.\d{2})', line)
-                    if time_match and total_duration > 0:
-                        hours, minutes, seconds = map(float, time_match.groups())
-                        current_seconds = hours * 3600 + minutes * 60 + seconds
-                        
-                        if progress_callback:
-                            progress_callback(current_seconds, total_duration)
-                        
-                        # Log progress every 10%
-                        progress_pct = (current_seconds / total_duration) * 100
-                        if int(progress_pct) % 10 == 0:
-                            logger.info(f"Progress: {progress_pct:.1f}% ({current_seconds:.0f}/{total_duration:.0f}s)")
+                # Only complete lines are parsed; a trailing partial line waits for the next read
+                data = pending + chunk
+                line_end = data.rfind(b'\n')
+                if line_end == -1:
+                    pending = data
+                    continue
+                pending = data[line_end + 1:]
+                
+                if not has_duration:
+                    continue
+                
+                # Only the newest out_time in this read matters for progress
+                key_pos = data.rfind(out_time_key, 0, line_end)
+                if key_pos == -1 or (key_pos > 0 and data[key_pos - 1] != 0x0A):
+                    continue
+                # out_time_ms is in microseconds despite its name; N/A before the first frame
+                out_time = data[key_pos + out_time_offset:data.index(b'\n', key_pos)].strip()
+                if out_time.isdigit():
+                    current_seconds = int(out_time) / 1_000_000
+                    
+                    if progress_callback:
+                        progress_callback(current_seconds, total_duration)
+                    
+                    # Log progress once per 10% step
+                    progress_pct = (current_seconds / total_duration) * 100
+                    decile = int(progress_pct) // 10
+                    if decile != last_logged_decile:
+                        last_logged_decile = decile
+                        logger.info(f"Progress: {progress_pct:.1f}% ({current_seconds:.0f}/{total_duration:.0f}s)")
             
             process.wait()
+            stderr_output = stderr_tail.read()
             
             if process.returncode != 0:
+                if stderr_output:
+                    logger.error(f"FFmpeg stderr: {stderr_output.strip()}")
                 error_msg = f"FFmpeg process failed with code {process.returncode}"
                 
                 # Specific error messages for common Railway issues
@@ -735,6 +1329,85 @@ class SubtitleProcessor:
                 raise SubtitleError(f"Process killed by system (out of memory). Use soft subtitles instead or upgrade server. Original error: {e}")
             raise SubtitleError(f"Unexpected error during subtitle burning: {e}")
     
+    def process_many(
+        self,
+        video_paths: List[Path],
+        subtitle_path: Path,
+        output_dir: Optional[Path] = None,
+        parallel: bool = False,
+        cancel_check=None
+    ) -> Dict[Path, Path]:
+        """
+        Burn one subtitle into several videos
+        
+        Subtitle validation, SRT->ASS conversion, fonts.conf and the filter
+        string are prepared once and shared; only the encodes run per video.
+        
+        Args:
+            video_paths: Paths to input videos
+            subtitle_path: Path to subtitle file shared by all videos
+            output_dir: Optional output directory (default: processing directory)
+            parallel: Run encodes concurrently, bounded by CPU count
+            cancel_check: Optional function() -> bool to check for cancellation
+            
+        Returns:
+            Dictionary mapping each successfully processed video to its output path
+            (failures of single videos are logged; a cancel raises SubtitleError)
+        """
+        if not video_paths:
+            return {}
+        
+        if output_dir is None:
+            output_dir = DIRS['processing']
+        
+        burn_context = self._prepare_burn_context(subtitle_path)
+        
+        def check_cancelled():
+            if cancel_check and cancel_check():
+                raise SubtitleError("Subtitle burning cancelled by user")
+        
+        def burn(video_path: Path) -> Path:
+            # Queued burns must not start FFmpeg once the batch is cancelled
+            check_cancelled()
+            return self.embed_hard_subtitle(
+                video_path,
+                subtitle_path,
+                output_path=output_dir / f"{video_path.stem}_hardsubbed.mp4",
+                cancel_check=cancel_check,
+                burn_context=burn_context
+            )
+        
+        output_files = {}
+        
+        if parallel:
+            # Each encode already uses several threads; only run as many as the cores allow
+            from config import PROCESSING_CONFIG
+            _, _, threads = self._get_burn_encoder_settings(PROCESSING_CONFIG.get('low_memory_mode', False))
+            max_workers = min(len(video_paths), max(1, (os.cpu_count() or 1) // threads))
+            logger.info(f"Burning subtitles into {len(video_paths)} videos with {max_workers} workers")
+            
+            # Threads suffice: the work happens in the FFmpeg child processes
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {video_path: executor.submit(burn, video_path) for video_path in video_paths}
+                for video_path, future in futures.items():
+                    try:
+                        output_files[video_path] = future.result()
+                    except Exception as e:
+                        # A cancel fails the whole batch rather than one video
+                        check_cancelled()
+                        logger.error(f"Failed to burn subtitles into {video_path}: {e}")
+        else:
+            for video_path in video_paths:
+                try:
+                    output_files[video_path] = burn(video_path)
+                except Exception as e:
+                    check_cancelled()
+                    logger.error(f"Failed to burn subtitles into {video_path}: {e}")
+        
+        logger.info(f"Subtitles burned into {len(output_files)}/{len(video_paths)} videos")
+        return output_files
+    
     def process_subtitle(
         self,
         video_path: Path,
@@ -773,7 +1446,13 @@ class SubtitleProcessor:
         else:
             logger.warning("GÜán+Å Hard subtitles are VERY SLOW (10-30 minutes)!")
             logger.warning("=ƒÆí Consider using soft subtitles for production")
-            return self.embed_hard_subtitle(video_path, subtitle_path, progress_callback=progress_callback, cancel_check=cancel_check)
+            return self.embed_hard_subtitle(
+                video_path,
+                subtitle_path,
+                progress_callback=progress_callback,
+                cancel_check=cancel_check,
+                video_info=video_info
+            )
 
 
 if __name__ == '__main__':
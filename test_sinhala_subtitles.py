@@ -132,6 +132,66 @@ def test_font_discovery():
         traceback.print_exc()
         return False
 
+def test_srt_markup():
+    """Test that SRT positioning and colour markup carry over to ASS"""
+    try:
+        from subtitle_processor import escape_ass_text
+        
+        cases = {
+            r'{\an8}Top line': r'{\an8}Top line',
+            '<font color="#ff0000">Red</font>': r'{\c&H0000FF&}Red{\c}',
+            r'{\i1}Dropped{\i0} {laughs}': r'Dropped \{laughs\}',
+        }
+        
+        logger.info("Testing SRT markup conversion...")
+        for srt_text, expected in cases.items():
+            converted = escape_ass_text(srt_text)
+            if converted != expected:
+                logger.error(f"✗ FAILED: {srt_text!r} -> {converted!r} (expected {expected!r})")
+                return False
+            logger.info(f"✓ {srt_text!r} -> {converted!r}")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"SRT markup test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_batch_cancel():
+    """Test that a cancelled batch burn stops instead of starting the remaining videos"""
+    try:
+        from logger import SubtitleError
+        
+        processor = SubtitleProcessor()
+        test_srt = create_test_sinhala_subtitle()
+        output_dir = Path('temp')
+        videos = [output_dir / f'test_sinhala_video_{i}.mp4' for i in range(3)]
+        
+        logger.info("Testing cancelled batch burn...")
+        for parallel in (False, True):
+            try:
+                processor.process_many(videos, test_srt, output_dir, parallel=parallel, cancel_check=lambda: True)
+            except SubtitleError as e:
+                logger.info(f"✓ {'Parallel' if parallel else 'Sequential'} batch cancelled: {e}")
+            else:
+                logger.error(f"✗ FAILED: {'parallel' if parallel else 'sequential'} batch ignored the cancel")
+                return False
+            
+            leftovers = [v for v in videos if (output_dir / f"{v.stem}_hardsubbed.mp4").exists()]
+            if leftovers:
+                logger.error(f"✗ FAILED: outputs written after cancel: {leftovers}")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"Batch cancel test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def main():
     """Run all tests"""
     print("\n" + "="*60)
@@ -156,6 +216,16 @@ def main():
     ass_file = test_ass_conversion()
     results['ass_conversion'] = ass_file is not None
     
+    # Test 4: SRT markup
+    print("\n[TEST 4] SRT Positioning and Colour Markup")
+    print("-" * 60)
+    results['srt_markup'] = test_srt_markup()
+    
+    # Test 5: Batch cancellation
+    print("\n[TEST 5] Cancelled Batch Burn")
+    print("-" * 60)
+    results['batch_cancel'] = test_batch_cancel()
+    
     # Summary
     print("\n" + "="*60)
     print("TEST SUMMARY")
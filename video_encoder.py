@@ -3,14 +3,56 @@ Video Encoding Module
 Handles multi-resolution video transcoding
 """
 import subprocess
-import json
+import logging
 import math
+import os
+import shlex
+import shutil
+import tempfile
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from config import RESOLUTIONS, FFMPEG_CONFIG, DIRS, PROCESSING_CONFIG, get_output_filename
-from logger import logger, EncodingError
+from config import RESOLUTIONS, FFMPEG_CONFIG, DIRS, PROCESSING_CONFIG, get_hardware_encoder, get_output_filename
+from logger import logger, EncodingError, StderrTail
+
+# Not closing fds lets subprocess use posix_spawn/vfork on Linux instead of fork + a close loop.
+# Safe here: Python creates fds (including other encodes' pipes) non-inheritable, so children
+# only get the stdio they are given. CPU pinning is applied by pid after spawn, not in preexec_fn
+SPAWN_CLOSE_FDS = False
+
+# Minimum seconds between progress debug lines per encode
+PROGRESS_LOG_SECONDS = 5.0
+
+# x264 preset names mapped to their closest hardware encoder presets
+NVENC_PRESETS = {
+    'ultrafast': 'p1', 'superfast': 'p1', 'veryfast': 'p2', 'faster': 'p3', 'fast': 'p4',
+    'medium': 'p5', 'slow': 'p6', 'slower': 'p7', 'veryslow': 'p7'
+}
+QSV_PRESETS = {'ultrafast': 'veryfast', 'superfast': 'veryfast'}
+
+# Rungs up to 5% taller than the source still count as "not upscaling" (e.g. 1072p -> 1080p)
+UPSCALE_TOLERANCE = 1.05
+
+# Preview thumbnails as fractions of the duration; fixed offsets when it is unknown
+THUMBNAIL_POSITIONS = (0.1, 0.5, 0.9)
+THUMBNAIL_FALLBACK_TIMESTAMPS = (10, 60, 120)
+
+# Content-adaptive ladder: a short CRF sample at 360p measures how hard the source is to compress
+LADDER_SAMPLE_SECONDS = 5
+LADDER_SAMPLE_HEIGHT = 360
+LADDER_SAMPLE_CRF = 23
+# CRF bitrate grows sub-linearly with pixel count; predicted demand = sample * pixel_ratio ** exponent
+LADDER_PIXEL_EXPONENT = 0.75
+# Rungs whose configured bitrate covers less than this share of the predicted demand are past the
+# convex-hull crossover: the next lower resolution looks better at the same bits
+LADDER_MIN_BITRATE_RATIO = 0.5
+
+# Hardware encoder -> (hwaccel, scale filter) that keep decoded frames in GPU memory
+GPU_SCALERS = {
+    'h264_nvenc': ('cuda', 'scale_cuda'),
+    'h264_qsv': ('qsv', 'scale_qsv'),
+}
 
 
 class VideoEncoder:
@@ -23,8 +65,62 @@ class VideoEncoder:
         self.preset = FFMPEG_CONFIG['preset']
         self.crf = FFMPEG_CONFIG['crf']
         self.pixel_format = FFMPEG_CONFIG['pixel_format']
+        # Numeric (video, audio) bitrates in kbit/s, parsed once from the '500k'-style config
+        self._bitrates: Dict[str, Tuple[int, int]] = {
+            name: (int(config['bitrate_video'].rstrip('k')), int(config['bitrate_audio'].rstrip('k')))
+            for name, config in self.resolutions.items()
+        }
+        self._rate_controls: Dict[str, str] = {
+            name: config.get('rate_control', 'capped_crf') for name, config in self.resolutions.items()
+        }
+        # Software-encoder tuning per resolution (-tune, -x264-params / -x265-params)
+        self._tuning_args: Dict[str, Tuple[str, ...]] = {
+            name: self._build_tuning_args(config) for name, config in self.resolutions.items()
+        }
+        # Per-resolution output arguments that do not depend on preset or threads.
+        # Capped CRF sets no -b:v target: the bitrate only bounds the VBV buffer
+        self._output_arg_templates: Dict[str, Tuple[str, ...]] = {
+            name: (
+                *(() if self._rate_controls[name] == 'capped_crf' else ('-b:v', f'{video_kbps}k')),
+                '-maxrate', f'{video_kbps}k',
+                '-bufsize', f'{2 * video_kbps}k',
+                '-c:a', self.audio_codec,
+                '-b:a', f'{audio_kbps}k',
+                '-ac', '2',  # Stereo audio
+                '-movflags', '+faststart',  # Enable streaming
+            )
+            for name, (video_kbps, audio_kbps) in self._bitrates.items()
+        }
+        # ffprobe dimensions keyed by (resolved path, mtime_ns, size)
+        self._probe_cache: Dict[Tuple[str, int, int], Dict] = {}
+        # Worker pool for parallel encodes, created on first use and reused across calls
+        self._pool: Optional[ThreadPoolExecutor] = None
     
-    def calculate_output_width(self, original_width: int, original_height: int, target_height: int) -> int:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def __del__(self):
+        self.close()
+    
+    def close(self):
+        """Shut down the parallel encoding pool, if one was started"""
+        pool = getattr(self, '_pool', None)
+        if pool is not None:
+            self._pool = None
+            pool.shutdown(wait=False)
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Shared pool with one worker per configured resolution (capped at the CPU count)"""
+        if self._pool is None:
+            max_workers = min(len(self.resolutions), os.cpu_count() or 1)
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='enc')
+        return self._pool
+    
+    @staticmethod
+    def calculate_output_width(original_width: int, original_height: int, target_height: int) -> int:
         """
         Calculate output width maintaining aspect ratio
         
@@ -35,33 +131,174 @@ class VideoEncoder:
             
         Returns:
             Calculated width (even number for codec compatibility)
+        
+        Raises:
+            EncodingError: If any dimension is not positive (e.g. after a bad probe)
+        
+        Examples:
+            >>> VideoEncoder.calculate_output_width(1920, 1080, 720)
+            1280
+            >>> VideoEncoder.calculate_output_width(1440, 1080, 720)
+            960
         """
-        aspect_ratio = original_width / original_height
-        calculated_width = int(target_height * aspect_ratio)
+        if original_width <= 0 or original_height <= 0 or target_height <= 0:
+            raise EncodingError(
+                f"Invalid dimensions: {original_width}x{original_height} -> height {target_height}"
+            )
         
-        # Ensure width is even (required by many codecs)
-        if calculated_width % 2 != 0:
-            calculated_width += 1
+        # Integer math keeps exact aspect ratios exact
+        calculated_width = target_height * original_width // original_height
+        
+        # Round up to even (required by many codecs)
+        return (calculated_width + 1) & ~1
+    
+    def _get_video_codec_args(
+        self,
+        preset: str,
+        gpu_frames: bool = False,
+        rate_control: str = 'capped_crf'
+    ) -> List[str]:
+        """Video encoder arguments, preferring a working GPU encoder over the software one."""
+        hw_encoder = get_hardware_encoder()
+        capped_crf = rate_control == 'capped_crf'
+        # Frames already in GPU memory keep their surface format; -pix_fmt would force a download
+        if hw_encoder == 'h264_nvenc':
+            if capped_crf:
+                # -b:v 0 stops NVENC's 2M default target from overriding the quality level
+                rate_args = ['-rc', 'vbr', '-cq', str(self.crf), '-b:v', '0']
+            else:
+                rate_args = ['-rc', 'cbr' if rate_control == 'cbr' else 'vbr']
+            return ['-c:v', 'h264_nvenc', '-preset', NVENC_PRESETS.get(preset, 'p5'),
+                    *rate_args] + ([] if gpu_frames else ['-pix_fmt', 'yuv420p'])
+        if hw_encoder == 'h264_qsv':
+            rate_args = ['-global_quality', str(self.crf)] if capped_crf else []
+            return ['-c:v', 'h264_qsv', '-preset', QSV_PRESETS.get(preset, preset),
+                    *rate_args] + ([] if gpu_frames else ['-pix_fmt', 'nv12'])
+        rate_args = ['-crf', str(self.crf)] if capped_crf else []
+        return ['-c:v', self.video_codec, '-preset', preset, *rate_args, '-pix_fmt', self.pixel_format]
+    
+    def _build_tuning_args(self, config: Dict) -> Tuple[str, ...]:
+        """-tune and codec-specific params from a RESOLUTIONS entry, for the software encoder."""
+        args = []
+        if config.get('tune'):
+            args.extend(['-tune', config['tune']])
+        if config.get('codec_params') and self.video_codec in ('libx264', 'libx265'):
+            # libx264 -> -x264-params, libx265 -> -x265-params
+            args.extend([f'-{self.video_codec[3:]}-params', config['codec_params']])
+        return tuple(args)
+    
+    def _needs_two_passes(self, resolution_name: str) -> bool:
+        """Whether resolution_name is encoded with two software passes."""
+        return self._rate_controls[resolution_name] == '2pass' and not get_hardware_encoder()
+    
+    def _get_input_args(self) -> List[str]:
+        """Decoder arguments: hardware decode on hosts with a working GPU encoder."""
+        if get_hardware_encoder():
+            # Frames come back to system memory, so the CPU scale filter still applies and
+            # inputs the GPU cannot decode fall back to software decoding
+            return ['-hwaccel', 'auto']
+        return []
+    
+    def _get_output_args(
+        self,
+        resolution_name: str,
+        preset: str,
+        thread_count: int,
+        gpu_frames: bool = False
+    ) -> List[str]:
+        """Codec, bitrate and muxer arguments for one resolution's output file."""
+        return [
+            *self._get_video_codec_args(preset, gpu_frames, self._rate_controls[resolution_name]),
+            # GPU encoders have their own tuning vocabulary
+            *(() if get_hardware_encoder() else self._tuning_args[resolution_name]),
+            *self._output_arg_templates[resolution_name],
+            '-threads', str(thread_count),
+            '-max_muxing_queue_size', '1024',  # Prevent memory overflow
+        ]
+    
+    def _threads_per_invocation(self, n_workers: int) -> int:
+        """Thread budget for each of n_workers concurrent FFmpeg processes."""
+        return max(1, (os.cpu_count() or n_workers) // max(1, n_workers))
+    
+    def _partition_cpus(self, n_workers: int) -> Optional[List[frozenset]]:
+        """
+        Split the CPUs this process may use into n_workers disjoint sets
         
-        return calculated_width
+        Returns:
+            One CPU set per worker, or None where affinity is not supported
+            or there are fewer CPUs than workers
+        """
+        if not hasattr(os, 'sched_getaffinity'):
+            return None
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) < n_workers:
+            return None
+        chunk = len(cpus) // n_workers
+        return [frozenset(cpus[i * chunk:(i + 1) * chunk]) for i in range(n_workers)]
+    
+    def _pin_process(self, pid: int, cpu_set: frozenset) -> None:
+        """Restrict a child process to cpu_set; threads it starts later inherit the mask."""
+        # Set from the parent rather than via preexec_fn, which is unsafe from worker threads
+        try:
+            os.sched_setaffinity(pid, cpu_set)
+        except OSError as e:
+            logger.debug(f"Could not set CPU affinity for FFmpeg process {pid}: {e}")
     
     def get_video_dimensions(self, video_path: Path) -> tuple:
         """
         Get video dimensions using ffprobe
         
+        Results are cached per (path, mtime, size), so every rung of a
+        resolution ladder shares one ffprobe run.
+        
         Args:
             video_path: Path to video file
             
         Returns:
             Tuple of (width, height)
         """
+        info = self._get_probe_info(video_path)
+        return info['width'], info['height']
+    
+    def get_video_duration(self, video_path: Path) -> Optional[float]:
+        """
+        Get video duration in seconds, from the same cached ffprobe run as the dimensions
+        
+        Args:
+            video_path: Path to video file
+            
+        Returns:
+            Duration in seconds, or None if the container does not report one
+        """
+        return self._get_probe_info(video_path)['duration']
+    
+    def _get_probe_info(self, video_path: Path) -> Dict:
+        """Cached ffprobe result for video_path, keyed by (path, mtime, size)."""
         try:
+            stat = video_path.stat()
+        except OSError as e:
+            raise EncodingError(f"Failed to get video dimensions: {e}")
+        
+        cache_key = (str(video_path.resolve()), stat.st_mtime_ns, stat.st_size)
+        info = self._probe_cache.get(cache_key)
+        if info is None:
+            info = self._probe_video(video_path)
+            self._probe_cache[cache_key] = info
+        return info
+    
+    def _probe_video(self, video_path: Path) -> Dict:
+        """Run ffprobe for the first video stream's width and height and the container duration."""
+        try:
+            # Everything needed is in the headers: cap probing and stop after one packet
             cmd = [
                 'ffprobe',
                 '-v', 'error',
+                '-probesize', '1000000',
+                '-analyzeduration', '1000000',
                 '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height',
-                '-of', 'json',
+                '-show_entries', 'stream=width,height:format=duration',
+                '-read_intervals', '%+#1',
+                '-of', 'csv=p=0:s=x',
                 str(video_path)
             ]
             
@@ -69,13 +306,24 @@ class VideoEncoder:
                 cmd,
                 capture_output=True,
                 text=True,
-                check=True
+                check=True,
+                close_fds=SPAWN_CLOSE_FDS
             )
             
-            info = json.loads(result.stdout)
-            stream = info['streams'][0]
+            # csv prints one line per section: "1920x1080" for the stream, then the duration
+            lines = result.stdout.split()
+            width, height = lines[0].split('x')
+            
+            try:
+                duration = float(lines[1])
+            except (IndexError, ValueError):
+                duration = None
             
-            return int(stream['width']), int(stream['height'])
+            width, height = int(width), int(height)
+            if width <= 0 or height <= 0:
+                raise ValueError(f"invalid video size {width}x{height}")
+            
+            return {'width': width, 'height': height, 'duration': duration}
             
         except Exception as e:
             raise EncodingError(f"Failed to get video dimensions: {e}")
@@ -85,7 +333,10 @@ class VideoEncoder:
         input_video: Path,
         resolution_name: str,
         output_dir: Optional[Path] = None,
-        cancel_check=None
+        cancel_check=None,
+        dims: Optional[Tuple[int, int]] = None,
+        threads: Optional[int] = None,
+        cpu_set: Optional[frozenset] = None
     ) -> Path:
         """
         Encode video to specific resolution
@@ -95,6 +346,9 @@ class VideoEncoder:
             resolution_name: Resolution key (e.g., '720p')
             output_dir: Optional output directory
             cancel_check: Optional function() -> bool to check for cancellation
+            dims: Optional (width, height) of the input, to skip probing again
+            threads: Optional cap on decoder and encoder threads (used when encoding in parallel)
+            cpu_set: Optional set of CPU ids to pin FFmpeg to (Linux only)
             
         Returns:
             Path to encoded video
@@ -106,7 +360,9 @@ class VideoEncoder:
         target_height = config['height']
         
         # Get original dimensions
-        original_width, original_height = self.get_video_dimensions(input_video)
+        if dims is None:
+            dims = self.get_video_dimensions(input_video)
+        original_width, original_height = dims
         
         # Calculate output dimensions
         output_width = self.calculate_output_width(original_width, original_height, target_height)
@@ -134,65 +390,40 @@ class VideoEncoder:
                 thread_count = 2
                 preset = 'veryfast'
             else:
-                thread_count = FFMPEG_CONFIG['max_threads']
+                thread_count = threads if threads is not None else FFMPEG_CONFIG['max_threads']
                 preset = config.get('preset', self.preset)
             
-            cmd = [
-                'ffmpeg',
+            # Progress goes to stdout as key=value lines; stderr only carries errors
+            cmd = ['ffmpeg', '-progress', 'pipe:1', '-nostats', '-loglevel', 'error']
+            if threads is not None:
+                # Input-side -threads caps the decoder too, not just the encoder
+                cmd.extend(['-threads', str(thread_count)])
+            cmd.extend(self._get_input_args())
+            cmd.extend([
                 '-i', str(input_video),
                 '-vf', f'scale={output_width}:{target_height}',
-                '-c:v', self.video_codec,
-                '-preset', preset,
-                '-crf', str(self.crf),
-                '-b:v', config['bitrate_video'],
-                '-maxrate', config['bitrate_video'],
-                '-bufsize', str(int(config['bitrate_video'].replace('k', '')) * 2) + 'k',
-                '-c:a', self.audio_codec,
-                '-b:a', config['bitrate_audio'],
-                '-ac', '2',  # Stereo audio
-                '-pix_fmt', self.pixel_format,
-                '-movflags', '+faststart',  # Enable streaming
-                '-threads', str(thread_count),
-                '-max_muxing_queue_size', '1024',  # Prevent memory overflow
-                '-y',  # Overwrite output
-                str(output_path)
-            ]
-            
-            logger.debug(f"FFmpeg command: {' '.join(cmd)}")
-            logger.info(f"Starting {resolution_name} encoding (this may take several minutes)...")
+            ])
+            cmd.extend(self._get_output_args(resolution_name, preset, thread_count))
             
-            # Run FFmpeg with progress monitoring
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                universal_newlines=True
-            )
+            if self._needs_two_passes(resolution_name):
+                # Each encode gets its own stats file so parallel rungs never share one
+                passlog_dir = Path(tempfile.mkdtemp(prefix=f'{resolution_name}_2pass_', dir=DIRS['temp']))
+                passlog = str(passlog_dir / 'ffmpeg2pass')
+                pass_cmds = [
+                    cmd + ['-pass', '1', '-passlogfile', passlog, '-an', '-f', 'null', '-y', os.devnull],
+                    cmd + ['-pass', '2', '-passlogfile', passlog, '-y', str(output_path)],
+                ]
+            else:
+                passlog_dir = None
+                pass_cmds = [cmd + ['-y', str(output_path)]]  # Overwrite output
             
-            # Monitor encoding progress with cancellation check
-            import time
-            for line in process.stdout:
-                # Check for cancellation
-                if cancel_check and cancel_check():
-                    logger.warning(f"Cancelling {resolution_name} encoding...")
-                    process.terminate()
-                    time.sleep(0.5)
-                    if process.poll() is None:  # Still running
-                        process.kill()
-                    # Delete partial output file
-                    if output_path.exists():
-                        output_path.unlink()
-                    raise EncodingError(f"{resolution_name} encoding cancelled by user")
-                
-                if 'time=' in line and 'speed=' in line:
-                    # Log progress periodically
-                    logger.debug(line.strip())
-            
-            process.wait()
-            
-            if process.returncode != 0:
-                raise EncodingError(f"FFmpeg encoding failed with code {process.returncode}")
+            try:
+                for pass_number, pass_cmd in enumerate(pass_cmds, 1):
+                    label = resolution_name if len(pass_cmds) == 1 else f"{resolution_name} pass {pass_number}/{len(pass_cmds)}"
+                    self._run_encode_pass(pass_cmd, label, output_path, cancel_check, cpu_set)
+            finally:
+                if passlog_dir is not None:
+                    shutil.rmtree(passlog_dir, ignore_errors=True)
             
             if not output_path.exists():
                 raise EncodingError(f"Output file was not created: {output_path}")
@@ -208,63 +439,438 @@ class VideoEncoder:
         except Exception as e:
             raise EncodingError(f"Unexpected error during {resolution_name} encoding: {e}")
     
+    def _run_encode_pass(
+        self,
+        cmd: List[str],
+        label: str,
+        output_path: Path,
+        cancel_check=None,
+        cpu_set: Optional[frozenset] = None
+    ):
+        """Run one FFmpeg encode of output_path, following its -progress output until it exits."""
+        if logger.is_enabled_for(logging.DEBUG):
+            logger.debug(f"FFmpeg command: {shlex.join(cmd)}")
+        logger.info(f"Starting {label} encoding (this may take several minutes)...")
+        
+        # Run FFmpeg with progress monitoring (line-buffered: one progress key per line)
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            close_fds=SPAWN_CLOSE_FDS
+        )
+        # Drained alongside stdout: undecodable input can log an error per packet
+        stderr_tail = StderrTail(process.stderr)
+        if cpu_set:
+            self._pin_process(process.pid, cpu_set)
+        
+        # Monitor encoding progress with cancellation check
+        import time
+        # Skip parsing and formatting entirely unless debug output is on
+        log_progress = logger.is_enabled_for(logging.DEBUG)
+        last_log = time.monotonic()
+        for line in process.stdout:
+            # Check for cancellation
+            if cancel_check and cancel_check():
+                logger.warning(f"Cancelling {label} encoding...")
+                process.terminate()
+                try:
+                    process.wait(timeout=0.5)  # Returns as soon as FFmpeg exits
+                except subprocess.TimeoutExpired:  # Still running
+                    process.kill()
+                    process.wait()
+                # Delete partial output file
+                if output_path.exists():
+                    output_path.unlink()
+                raise EncodingError(f"{label} encoding cancelled by user")
+            
+            if log_progress and line.startswith('out_time='):
+                now = time.monotonic()
+                if now - last_log >= PROGRESS_LOG_SECONDS:
+                    last_log = now
+                    logger.debug(f"{label} progress: {line[len('out_time='):].strip()}")
+        
+        process.wait()
+        stderr_output = stderr_tail.read()
+        
+        if process.returncode != 0:
+            if stderr_output:
+                logger.error(f"FFmpeg stderr: {stderr_output.strip()}")
+            raise EncodingError(f"FFmpeg encoding failed with code {process.returncode}")
+    
+    def _drop_upscaled_rungs(self, resolutions: List[str], original_height: int) -> List[str]:
+        """
+        Remove rungs taller than the source (with UPSCALE_TOLERANCE slack)
+        
+        Upscaling only adds bytes without adding detail. If every rung is
+        taller than the source, the smallest one is kept so there is still an output.
+        """
+        max_height = original_height * UPSCALE_TOLERANCE
+        kept = [res for res in resolutions if self.resolutions[res]['height'] <= max_height]
+        skipped = [res for res in resolutions if res not in kept]
+        if not kept and resolutions:
+            kept = [min(resolutions, key=lambda res: self.resolutions[res]['height'])]
+            skipped.remove(kept[0])
+        if skipped:
+            logger.info(f"Skipping {skipped}: taller than the {original_height}p source")
+        return kept
+    
+    def predict_ladder(self, input_video: Path, dims: Optional[Tuple[int, int]] = None) -> List[str]:
+        """
+        Pick the resolutions worth encoding for this particular video
+        
+        Rungs taller than the source are never encoded. The rest are checked
+        against a short CRF encode of the source at 360p: its bitrate measures
+        how hard the content is to compress, and rungs whose configured bitrate
+        falls far short of the predicted demand are dropped.
+        
+        Args:
+            input_video: Path to input video
+            dims: Optional (width, height) of the input, to skip probing again
+            
+        Returns:
+            List of resolution names, lowest first
+        """
+        if dims is None:
+            dims = self.get_video_dimensions(input_video)
+        original_width, original_height = dims
+        
+        by_height = sorted(self.resolutions, key=lambda name: self.resolutions[name]['height'])
+        candidates = self._drop_upscaled_rungs(by_height, original_height)
+        if len(candidates) == 1:
+            return candidates
+        
+        try:
+            sample_kbps = self._measure_sample_bitrate(input_video)
+        except EncodingError as e:
+            logger.warning(f"Complexity pre-pass failed, keeping ladder {candidates}: {e}")
+            return candidates
+        
+        sample_pixels = self.calculate_output_width(original_width, original_height, LADDER_SAMPLE_HEIGHT) * LADDER_SAMPLE_HEIGHT
+        ladder = candidates[:1]
+        for resolution_name in candidates[1:]:
+            target_height = self.resolutions[resolution_name]['height']
+            pixels = self.calculate_output_width(original_width, original_height, target_height) * target_height
+            predicted_kbps = sample_kbps * (pixels / sample_pixels) ** LADDER_PIXEL_EXPONENT
+            video_kbps = self._bitrates[resolution_name][0]
+            if video_kbps < predicted_kbps * LADDER_MIN_BITRATE_RATIO:
+                logger.info(f"Skipping {resolution_name}: {video_kbps}k is too starved for "
+                            f"~{predicted_kbps:.0f}k predicted demand")
+                continue
+            ladder.append(resolution_name)
+        
+        logger.info(f"Predicted ladder ({sample_kbps:.0f}k at {LADDER_SAMPLE_HEIGHT}p): {ladder}")
+        return ladder
+    
+    def _measure_sample_bitrate(self, input_video: Path) -> float:
+        """Bitrate in kbps of a quick CRF encode of the first seconds of input_video at 360p."""
+        duration = self.get_video_duration(input_video)
+        sample_seconds = min(LADDER_SAMPLE_SECONDS, duration) if duration else LADDER_SAMPLE_SECONDS
+        
+        cmd = [
+            'ffmpeg', '-nostats', '-loglevel', 'error',
+            '-ss', '0', '-t', str(LADDER_SAMPLE_SECONDS),
+            '-i', str(input_video),
+            '-an', '-sn',
+            '-vf', f'scale=-2:{LADDER_SAMPLE_HEIGHT}',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', str(LADDER_SAMPLE_CRF),
+            # Only the encoded size matters: stream raw H.264 back instead of writing a file
+            '-f', 'h264', 'pipe:1'
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, check=True, close_fds=SPAWN_CLOSE_FDS)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise EncodingError(f"Sample encode failed: {e}")
+        
+        if not result.stdout:
+            raise EncodingError("Sample encode produced no video")
+        return len(result.stdout) * 8 / sample_seconds / 1000
+    
     def encode_all_resolutions(
         self,
         input_video: Path,
         resolutions: Optional[List[str]] = None,
-        parallel: bool = None
+        parallel: bool = None,
+        fused_hwaccel: bool = True,
+        cancel_check=None,
+        progress_callback=None
     ) -> Dict[str, Path]:
         """
         Encode video to all specified resolutions
         
         Args:
             input_video: Path to input video
-            resolutions: List of resolution names (default: all)
+            resolutions: List of resolution names (default: all, or predicted per video
+                with adaptive_ladder, see predict_ladder)
             parallel: Enable parallel encoding (default: from config)
+            fused_hwaccel: Decode and scale on the GPU in the single-pass encode
+            cancel_check: Optional function() -> bool to check for cancellation
+            progress_callback: Optional function(current, total) as encoding advances
+                (seconds of input for the single-pass encode, otherwise resolutions done)
             
         Returns:
             Dictionary mapping resolution names to output paths
         """
-        if resolutions is None:
-            resolutions = list(self.resolutions.keys())
-        
         if parallel is None:
             parallel = PROCESSING_CONFIG['parallel_encoding']
         
+        # Reject typos (and an empty selection) before any ffprobe or ffmpeg run
+        if resolutions is not None:
+            if not resolutions:
+                raise EncodingError("No resolutions requested")
+            unknown = [res for res in resolutions if res not in self.resolutions]
+            if unknown:
+                raise EncodingError(f"Unknown resolution: {', '.join(unknown)}")
+        
+        # Probe once up front so parallel workers never each spawn ffprobe
+        try:
+            dims = self.get_video_dimensions(input_video)
+        except EncodingError as e:
+            # Every resolution needs the dimensions, so none of them can be encoded
+            logger.error(f"Failed to encode {resolutions or list(self.resolutions.keys())}: {e}")
+            return {}
+        
+        if resolutions is None:
+            if PROCESSING_CONFIG.get('adaptive_ladder', False):
+                resolutions = self.predict_ladder(input_video, dims=dims)
+            else:
+                resolutions = list(self.resolutions.keys())
+        
+        if not PROCESSING_CONFIG.get('allow_upscale', False):
+            resolutions = self._drop_upscaled_rungs(resolutions, dims[1])
+        
         logger.info(f"Starting multi-resolution encoding for: {resolutions}")
         logger.info(f"Parallel encoding: {'Enabled' if parallel else 'Disabled'}")
         
+        # Create every output directory here, not inside each (possibly parallel) encode
+        output_dirs = {res: DIRS['outputs'] / res for res in resolutions}
+        for output_dir in output_dirs.values():
+            output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # One decode feeding every rung beats decoding the input once per resolution.
+        # Low-memory hosts keep one encoder at a time instead
+        # Two-pass rungs need a separate first pass, which a shared single-pass graph cannot do
+        fusable = not any(self._needs_two_passes(res) for res in resolutions)
+        if len(resolutions) > 1 and fusable and not PROCESSING_CONFIG.get('low_memory_mode', False):
+            # GPU scaling first when available; inputs or drivers it rejects retry with CPU scaling
+            gpu_attempts = [True, False] if fused_hwaccel and get_hardware_encoder() in GPU_SCALERS else [False]
+            for gpu_scaling in gpu_attempts:
+                try:
+                    output_files = self.encode_all_resolutions_fused(
+                        input_video, resolutions, cancel_check=cancel_check, dims=dims,
+                        gpu_scaling=gpu_scaling, output_dirs=output_dirs, progress_callback=progress_callback
+                    )
+                    logger.info(f"Encoding completed for {len(output_files)}/{len(resolutions)} resolutions")
+                    return output_files
+                except EncodingError as e:
+                    if cancel_check and cancel_check():
+                        raise
+                    if gpu_scaling:
+                        logger.warning(f"GPU single-pass encoding failed, retrying with CPU scaling: {e}")
+                    else:
+                        logger.warning(f"Single-pass encoding failed, encoding resolutions separately: {e}")
+        
         output_files = {}
         
         if parallel:
-            # Parallel encoding using ThreadPoolExecutor
-            with ThreadPoolExecutor(max_workers=len(resolutions)) as executor:
-                future_to_resolution = {
-                    executor.submit(self.encode_resolution, input_video, res): res
-                    for res in resolutions
-                }
-                
-                for future in as_completed(future_to_resolution):
-                    resolution = future_to_resolution[future]
-                    try:
-                        output_path = future.result()
-                        output_files[resolution] = output_path
-                    except Exception as e:
-                        logger.error(f"Failed to encode {resolution}: {e}")
-                        # Continue with other resolutions
+            # Parallel encoding on the shared ThreadPoolExecutor; split the cores between
+            # the FFmpeg processes instead of letting each one claim all of them
+            threads = self._threads_per_invocation(len(resolutions))
+            # Disjoint CPU sets keep each encoder's threads on their own cores (and caches)
+            cpu_sets = self._partition_cpus(len(resolutions)) or [None] * len(resolutions)
+            logger.info(f"Threads per encode: {threads}")
+            executor = self._get_pool()
+            future_to_resolution = {
+                executor.submit(
+                    self.encode_resolution, input_video, res, output_dir=output_dirs[res], cancel_check=cancel_check,
+                    dims=dims, threads=len(cpu_set) if cpu_set else threads, cpu_set=cpu_set
+                ): res
+                for res, cpu_set in zip(resolutions, cpu_sets)
+            }
+            
+            for done, future in enumerate(as_completed(future_to_resolution), 1):
+                resolution = future_to_resolution[future]
+                try:
+                    output_path = future.result()
+                    output_files[resolution] = output_path
+                except Exception as e:
+                    logger.error(f"Failed to encode {resolution}: {e}")
+                    # Continue with other resolutions
+                if progress_callback:
+                    progress_callback(done, len(resolutions))
         else:
             # Sequential encoding
-            for resolution in resolutions:
+            for done, resolution in enumerate(resolutions, 1):
                 try:
-                    output_path = self.encode_resolution(input_video, resolution)
+                    output_path = self.encode_resolution(
+                        input_video, resolution, output_dir=output_dirs[resolution],
+                        cancel_check=cancel_check, dims=dims
+                    )
                     output_files[resolution] = output_path
                 except Exception as e:
                     logger.error(f"Failed to encode {resolution}: {e}")
                     # Continue with other resolutions
+                if progress_callback:
+                    progress_callback(done, len(resolutions))
+        
+        if cancel_check and cancel_check():
+            raise EncodingError("Encoding cancelled by user")
         
         logger.info(f"Encoding completed for {len(output_files)}/{len(resolutions)} resolutions")
         return output_files
     
+    def encode_all_resolutions_fused(
+        self,
+        input_video: Path,
+        resolutions: Optional[List[str]] = None,
+        cancel_check=None,
+        dims: Optional[Tuple[int, int]] = None,
+        gpu_scaling: bool = False,
+        output_dirs: Optional[Dict[str, Path]] = None,
+        progress_callback=None
+    ) -> Dict[str, Path]:
+        """
+        Encode every resolution with a single FFmpeg process
+        
+        The input is decoded once and split into one scaler + encoder per
+        resolution, instead of decoding the whole file again for each rung.
+        With gpu_scaling (and a CUDA/QSV encoder), decoding, scaling and
+        encoding all stay in GPU memory.
+        
+        Args:
+            input_video: Path to input video
+            resolutions: List of resolution names (default: all)
+            cancel_check: Optional function() -> bool to check for cancellation
+            dims: Optional (width, height) of the input, to skip probing again
+            gpu_scaling: Scale with the hardware encoder's GPU filter
+            output_dirs: Optional existing output directory per resolution
+            progress_callback: Optional function(current_sec, total_sec) fed from -progress
+            
+        Returns:
+            Dictionary mapping resolution names to output paths
+        """
+        if resolutions is None:
+            resolutions = list(self.resolutions.keys())
+        
+        unknown = [res for res in resolutions if res not in self.resolutions]
+        if unknown:
+            raise EncodingError(f"Unknown resolution: {', '.join(unknown)}")
+        
+        if dims is None:
+            dims = self.get_video_dimensions(input_video)
+        original_width, original_height = dims
+        
+        # All encoders run inside one process; give each its share of the cores
+        thread_count = self._threads_per_invocation(len(resolutions))
+        
+        gpu_scaler = GPU_SCALERS.get(get_hardware_encoder()) if gpu_scaling else None
+        if gpu_scaler:
+            hwaccel, scale_filter = gpu_scaler
+            input_args = ['-hwaccel', hwaccel, '-hwaccel_output_format', hwaccel]
+        else:
+            scale_filter = 'scale'
+            input_args = self._get_input_args()
+        
+        filter_chains = [f"[0:v]split={len(resolutions)}" + ''.join(f"[s{idx}]" for idx in range(len(resolutions)))]
+        output_args = []
+        output_paths = {}
+        for idx, resolution_name in enumerate(resolutions):
+            config = self.resolutions[resolution_name]
+            target_height = config['height']
+            output_width = self.calculate_output_width(original_width, original_height, target_height)
+            filter_chains.append(f"[s{idx}]{scale_filter}={output_width}:{target_height}[o{idx}]")
+            
+            if output_dirs and resolution_name in output_dirs:
+                output_dir = output_dirs[resolution_name]
+            else:
+                output_dir = DIRS['outputs'] / resolution_name
+                output_dir.mkdir(parents=True, exist_ok=True)
+            output_path = output_dir / get_output_filename(input_video.name, resolution_name, with_subtitles=True)
+            output_paths[resolution_name] = output_path
+            
+            logger.info(f"Encoding {resolution_name}: {output_width}x{target_height}")
+            output_args.extend(['-map', f'[o{idx}]', '-map', '0:a?'])
+            output_args.extend(self._get_output_args(
+                resolution_name, config.get('preset', self.preset), thread_count, gpu_frames=bool(gpu_scaler)
+            ))
+            output_args.append(str(output_path))
+        
+        cmd = [
+            'ffmpeg', '-progress', 'pipe:1', '-nostats', '-loglevel', 'error', '-y',
+            *input_args,
+            '-i', str(input_video),
+            '-filter_complex', ';'.join(filter_chains)
+        ] + output_args
+        
+        if logger.is_enabled_for(logging.DEBUG):
+            logger.debug(f"FFmpeg command: {shlex.join(cmd)}")
+        logger.info(f"Starting single-pass encoding of {resolutions} (this may take several minutes)...")
+        
+        def remove_partial_outputs():
+            for output_path in output_paths.values():
+                if output_path.exists():
+                    output_path.unlink()
+        
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            bufsize=1,
+            close_fds=SPAWN_CLOSE_FDS
+        )
+        stderr_tail = StderrTail(process.stderr)
+        
+        import time
+        log_progress = logger.is_enabled_for(logging.DEBUG)
+        last_log = time.monotonic()
+        # One progress stream covers every output, so it is reported as a single position
+        total_duration = self.get_video_duration(input_video) if progress_callback else None
+        for line in process.stdout:
+            if total_duration and line.startswith('out_time_us='):
+                out_time_us = line[len('out_time_us='):].strip()
+                if out_time_us.isdigit():
+                    progress_callback(min(int(out_time_us) / 1_000_000, total_duration), total_duration)
+            
+            if cancel_check and cancel_check():
+                logger.warning("Cancelling single-pass encoding...")
+                process.terminate()
+                try:
+                    process.wait(timeout=0.5)  # Returns as soon as FFmpeg exits
+                except subprocess.TimeoutExpired:  # Still running
+                    process.kill()
+                    process.wait()
+                remove_partial_outputs()
+                raise EncodingError("Encoding cancelled by user")
+            
+            if log_progress and line.startswith('out_time='):
+                now = time.monotonic()
+                if now - last_log >= PROGRESS_LOG_SECONDS:
+                    last_log = now
+                    logger.debug(f"Single-pass encoding progress: {line[len('out_time='):].strip()}")
+        
+        process.wait()
+        stderr_output = stderr_tail.read()
+        
+        if process.returncode != 0:
+            remove_partial_outputs()
+            if stderr_output:
+                logger.error(f"FFmpeg stderr: {stderr_output.strip()}")
+            raise EncodingError(f"Single-pass FFmpeg encoding failed with code {process.returncode}")
+        
+        missing = [str(path) for path in output_paths.values() if not path.exists()]
+        if missing:
+            raise EncodingError(f"Output files were not created: {', '.join(missing)}")
+        
+        for resolution_name, output_path in output_paths.items():
+            output_size = output_path.stat().st_size / (1024 * 1024)  # MB
+            logger.info(f"✓ {resolution_name} encoding completed: {output_size:.2f} MB")
+        
+        return output_paths
+    
     def create_preview_thumbnails(self, video_path: Path, output_dir: Optional[Path] = None) -> List[Path]:
         """
         Generate preview thumbnails from video
@@ -284,27 +890,40 @@ class VideoEncoder:
         
         try:
             # Generate thumbnails at 10%, 50%, and 90% of video duration
-            timestamps = ['00:00:10', '00:01:00', '00:02:00']
-            thumbnail_paths = []
-            
-            for i, timestamp in enumerate(timestamps, 1):
-                thumbnail_path = output_dir / f"{video_path.stem}_thumb_{i}.jpg"
-                
-                cmd = [
-                    'ffmpeg',
-                    '-ss', timestamp,
-                    '-i', str(video_path),
-                    '-vframes', '1',
-                    '-q:v', '2',
-                    '-y',
-                    str(thumbnail_path)
-                ]
-                
-                subprocess.run(cmd, capture_output=True, check=True)
-                
-                if thumbnail_path.exists():
-                    thumbnail_paths.append(thumbnail_path)
-                    logger.info(f"Thumbnail created: {thumbnail_path}")
+            duration = self.get_video_duration(video_path)
+            if duration:
+                timestamps = [duration * fraction for fraction in THUMBNAIL_POSITIONS]
+            else:
+                timestamps = list(THUMBNAIL_FALLBACK_TIMESTAMPS)
+            
+            candidate_paths = [output_dir / f"{video_path.stem}_thumb_{i}.jpg" for i in range(1, len(timestamps) + 1)]
+            for stale_path in candidate_paths:
+                stale_path.unlink(missing_ok=True)
+            
+            # One process, but each thumbnail gets its own input with an input-side seek,
+            # so FFmpeg jumps to each timestamp instead of demuxing everything before it
+            cmd = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y']
+            for timestamp in timestamps:
+                cmd.extend(['-ss', f"{timestamp:.3f}", '-i', str(video_path)])
+            for index, thumbnail_path in enumerate(candidate_paths):
+                cmd.extend(['-map', f'{index}:v:0', '-frames:v', '1', '-q:v', '2', str(thumbnail_path)])
+            
+            if logger.is_enabled_for(logging.DEBUG):
+                logger.debug(f"FFmpeg command: {shlex.join(cmd)}")
+            
+            # Nothing reads the output; with -loglevel error only a failure leaves anything on stderr
+            result = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, close_fds=SPAWN_CLOSE_FDS
+            )
+            if result.returncode != 0:
+                raise EncodingError(f"FFmpeg exited with code {result.returncode}: {result.stderr.strip()}")
+            
+            thumbnail_paths = [path for path in candidate_paths if path.exists()]
+            for thumbnail_path in thumbnail_paths:
+                logger.info(f"Thumbnail created: {thumbnail_path}")
+            if len(thumbnail_paths) < len(candidate_paths):
+                # A timestamp past the end (e.g. fallback times on a short clip) yields no frame
+                logger.warning(f"Only {len(thumbnail_paths)}/{len(candidate_paths)} thumbnails were created")
             
             return thumbnail_paths
             
@@ -312,7 +931,6 @@ class VideoEncoder:
             logger.warning(f"Failed to generate thumbnails: {e}")
             return []
 
-
 if __name__ == '__main__':
     # Test encoder
     encoder = VideoEncoder()
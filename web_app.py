@@ -1,163 +1,620 @@
 """
 Flask Web Application for Video Processing System
 """
-from flask import Flask, render_template, request, jsonify, send_file
-from pathlib import Path
+from flask import Flask, Request, Response, render_template, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
+from pathlib import Path, PurePosixPath, PureWindowsPath
 from werkzeug.utils import secure_filename
 import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
+from urllib.parse import quote
 import json
+import atexit
+import hashlib
+import mimetypes
 import os
+import queue
+import shutil
+import sqlite3
+import tempfile
+import time
 
-from config import WEB_CONFIG, DIRS
+try:
+    import orjson  # Optional (pip install orjson): much faster job-state encode/decode
+except ImportError:
+    orjson = None
+
+try:
+    import waitress  # Production WSGI server; falls back to Flask's development server
+except ImportError:
+    waitress = None
+
+from config import WEB_CONFIG, DIRS, RESOLUTIONS
 from main import VideoProcessingPipeline
-from logger import logger
+from downloader import Downloader
+from subtitle_processor import SubtitleProcessor
+from video_encoder import VideoEncoder
+from logger import logger, JobCancelled, EncodingError
+
+
+
+class UploadRequest(Request):
+    """Request that spools multipart file uploads straight into the downloads directory"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Same filesystem as the final path, so store_upload() can hard-link instead of copying
+        return tempfile.NamedTemporaryFile('wb+', dir=DIRS['downloads'], prefix='.upload_')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify()/request.json through orjson; the jobs list is re-encoded on every poll"""
+    
+    def _dump_bytes(self, obj) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    
+    def dumps(self, obj, **kwargs):
+        return self._dump_bytes(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes to the response as they are (the default goes through str)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dump_bytes(obj), mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = WEB_CONFIG['max_upload_size']
 app.config['UPLOAD_FOLDER'] = DIRS['downloads']
+app.config['USE_X_SENDFILE'] = WEB_CONFIG['use_x_sendfile']
 
 # Store active jobs
 active_jobs = {}
-completed_jobs = {}
+completed_jobs = OrderedDict()  # Oldest first; capped at MAX_COMPLETED_JOBS
 cancelled_jobs = set()  # Track cancelled job IDs
-queued_jobs = []  # Queue of pending jobs
-current_running_job = None  # Track the single running job
+running_jobs = {}  # job_id -> start time of jobs a worker has picked up, oldest first
+_inflight_jobs = {}  # job_dedup_key(...) -> job_id of identical URL jobs still queued or running
+# Guards every mutation of the job globals above; readers snapshot under it and work outside
+_jobs_lock = threading.RLock()
+# Bumped on every mutation of the job globals; the ETag of the polling endpoints.
+# Starts from the clock so a tag handed out before a restart never matches afterwards.
+_jobs_version = time.time_ns()
+# Notified with every bump of _jobs_version; /api/events streams wait on it
+_jobs_changed = threading.Condition(_jobs_lock)
 
 # Allowed subtitle extensions
-ALLOWED_EXTENSIONS = {'.srt', '.ass', '.vtt', '.sub', '.ssa'}
+ALLOWED_EXTENSIONS = frozenset(('.srt', '.ass', '.vtt', '.sub', '.ssa'))
+ALLOWED_EXTENSIONS_TEXT = ', '.join(sorted(ALLOWED_EXTENSIONS))
+
+# Chunk size for streaming raw (application/octet-stream) uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Minimum seconds between progress updates of the same task; bursts from FFmpeg are dropped
+PROGRESS_UPDATE_INTERVAL = 0.25
+
+# Steps shown for every job, in order; JobProcessor tracks one status per entry
+TASK_NAMES = ('Download Video', 'Download/Upload Subtitle', 'Process Subtitles', 'Encode Videos')
+
+_MB = 1024 * 1024
+_GB = _MB * 1024
+
+# /api/files/browse listing cache (see get_files_info)
+BROWSE_CACHE_TTL = 10.0
+BROWSE_IDLE_SECONDS = 60.0  # Refresher thread exits after this long without a browse request
+_browse_cache = {'key': None, 'value': None, 'time': 0.0, 'requested': 0.0}
+_browse_cache_lock = threading.Lock()
+_browse_refresher = None
 
 # Progress tracking
 job_progress = {}  # {job_id: {'current': 0, 'total': 100, 'task': 'description'}}
 
-# Job persistence file
+# Job persistence: JOBS_FILE is a full snapshot (written on startup, shutdown and compaction),
+# JOBS_LOG holds the changes since then, one JSON object per line
 JOBS_FILE = DIRS['logs'] / 'jobs_state.json'
+JOBS_LOG = DIRS['logs'] / 'jobs_state.log'
+JOBS_LOG_MAX_BYTES = 10 * 1024 * 1024  # Compact into a new snapshot past this size
+_completed_dirty = set()  # completed_jobs ids not yet written to JOBS_LOG (guarded by _jobs_lock)
 
+# Completed history kept in memory; older jobs move to the JOBS_ARCHIVE SQLite database,
+# where /api/status and downloads still find them
+MAX_COMPLETED_JOBS = 200
+JOBS_ARCHIVE = DIRS['logs'] / 'jobs_archive.db'
+_archive_db = None
+_archive_db_lock = threading.Lock()
+_evicted_jobs = []  # (job_id, record) evicted but not yet archived (guarded by _jobs_lock)
+_jobs_log_file = None
 
-def save_jobs_to_disk():
-    """Save current job state to disk"""
-    try:
+# Optional age limit on completed_jobs, enforced by a sweeper thread (see expire_completed_jobs)
+JOB_TTL_SECONDS = WEB_CONFIG['completed_job_ttl']
+JOB_SWEEP_INTERVAL = 60.0
+
+# Non-terminal state changes are coalesced into one write per this many seconds
+JOBS_SAVE_DELAY = 2.0
+_jobs_dirty = threading.Event()
+_jobs_save_now = threading.Event()  # Terminal transitions: write without waiting out the delay
+_jobs_save_lock = threading.Lock()  # One writer at a time (persister thread vs. shutdown compaction)
+_persister_lock = threading.Lock()
+_persister_thread = None
+
+
+def dump_json_bytes(data) -> bytes:
+    """Compact JSON encoding with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def load_json_bytes(data: bytes):
+    """Parse JSON bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def bump_jobs_version():
+    """Mark the job globals as changed (caller holds _jobs_lock)"""
+    global _jobs_version
+    _jobs_version += 1
+    _jobs_changed.notify_all()
+
+
+def add_completed_job(job_id, record):
+    """Record a finished job, evicting the oldest beyond MAX_COMPLETED_JOBS (caller holds _jobs_lock)"""
+    completed_jobs[job_id] = record
+    completed_jobs.move_to_end(job_id)
+    _completed_dirty.add(job_id)
+    bump_jobs_version()
+    while len(completed_jobs) > MAX_COMPLETED_JOBS:
+        old_id, old_record = completed_jobs.popitem(last=False)
+        _completed_dirty.discard(old_id)
+        _evicted_jobs.append((old_id, old_record))
+
+
+def _get_archive_db():
+    """JOBS_ARCHIVE connection, created on first use (caller holds _archive_db_lock)"""
+    global _archive_db
+    
+    if _archive_db is None:
+        db = sqlite3.connect(JOBS_ARCHIVE, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute('CREATE TABLE IF NOT EXISTS jobs '
+                   '(id TEXT PRIMARY KEY, status TEXT, payload BLOB, completed_at TEXT)')
+        db.execute('CREATE INDEX IF NOT EXISTS jobs_completed_at ON jobs (completed_at)')
+        _archive_db = db
+    return _archive_db
+
+
+def _archive_jobs(evicted):
+    """Store evicted (job_id, record) pairs in JOBS_ARCHIVE"""
+    if evicted:
+        rows = [(job_id, record.get('status'), dump_json_bytes(record), record.get('timestamp'))
+                for job_id, record in evicted]
+        with _archive_db_lock:
+            db = _get_archive_db()
+            with db:
+                db.executemany('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)', rows)
+
+
+def load_archived_job(job_id):
+    """Record of a job evicted from completed_jobs, or None"""
+    with _archive_db_lock:
+        row = _get_archive_db().execute('SELECT payload FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return load_json_bytes(row[0]) if row else None
+
+
+def list_archived_jobs(limit: int, offset: int):
+    """
+    Page through archived jobs, newest first
+    
+    Returns:
+        (total count, [(job_id, record), ...])
+    """
+    with _archive_db_lock:
+        db = _get_archive_db()
+        total = db.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+        rows = db.execute('SELECT id, payload FROM jobs ORDER BY completed_at DESC LIMIT ? OFFSET ?',
+                          (limit, offset)).fetchall()
+    return total, [(job_id, load_json_bytes(payload)) for job_id, payload in rows]
+
+
+def expire_completed_jobs(ttl_seconds: float) -> int:
+    """
+    Move completed jobs older than ttl_seconds to the archive
+    
+    completed_jobs is ordered by completion, so the sweep stops at the first
+    job that is still fresh.
+    
+    Returns:
+        Number of jobs expired
+    """
+    cutoff = datetime.now().timestamp() - ttl_seconds
+    expired = 0
+    with _jobs_lock:
+        while completed_jobs:
+            job_id, record = next(iter(completed_jobs.items()))
+            try:
+                finished_at = datetime.fromisoformat(record.get('timestamp', '')).timestamp()
+            except ValueError:
+                finished_at = cutoff  # No usable timestamp: treat as expired
+            if finished_at > cutoff:
+                break
+            completed_jobs.popitem(last=False)
+            _completed_dirty.discard(job_id)
+            _evicted_jobs.append((job_id, record))
+            expired += 1
+        if expired:
+            bump_jobs_version()
+    
+    if expired:
+        logger.info(f"Expired {expired} completed jobs older than {ttl_seconds}s")
+        schedule_jobs_save()
+    return expired
+
+
+def _expire_jobs_loop():
+    """Background sweeper for JOB_TTL_SECONDS"""
+    while True:
+        time.sleep(JOB_SWEEP_INTERVAL)
+        try:
+            expire_completed_jobs(JOB_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Completed job sweep failed: {e}")
+
+
+def _take_evicted_jobs():
+    """Pending evictions, cleared (caller holds _jobs_lock)"""
+    evicted = list(_evicted_jobs)
+    _evicted_jobs.clear()
+    return evicted
+
+
+def _write_jobs_snapshot() -> dict:
+    """Rewrite JOBS_FILE with the full state and empty JOBS_LOG (caller holds _jobs_save_lock)"""
+    global _jobs_log_file
+    
+    # Snapshot two levels deep so JSON encoding never sees a dict another thread resizes
+    with _jobs_lock:
         state = {
-            'active_jobs': active_jobs,
-            'completed_jobs': completed_jobs,
+            'active_jobs': {job_id: dict(job) for job_id, job in active_jobs.items()},
+            'completed_jobs': dict(completed_jobs),
             'cancelled_jobs': list(cancelled_jobs),
             'timestamp': datetime.now().isoformat()
         }
-        with open(JOBS_FILE, 'w') as f:
-            json.dump(state, f, indent=2)
-        logger.info(f"Jobs saved to disk: {len(active_jobs)} active, {len(completed_jobs)} completed")
+        _completed_dirty.clear()
+        evicted = _take_evicted_jobs()
+    
+    # The snapshot no longer has these, so archive them before it replaces the old one
+    _archive_jobs(evicted)
+    
+    # Write a sibling file and rename it over the old one: a crash mid-write
+    # leaves the previous state intact instead of a truncated file
+    tmp_path = JOBS_FILE.with_suffix('.json.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(dump_json_bytes(state))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, JOBS_FILE)
+    
+    # Everything in the log is in the snapshot now
+    if _jobs_log_file is not None:
+        _jobs_log_file.close()
+        _jobs_log_file = None
+    open(JOBS_LOG, 'wb').close()
+    return state
+
+
+def compact_jobs_state():
+    """Write a full job state snapshot and clear the change log"""
+    try:
+        with _jobs_save_lock:
+            state = _write_jobs_snapshot()
+        logger.info(f"Job state snapshot written: {len(state['active_jobs'])} active, "
+                    f"{len(state['completed_jobs'])} completed")
+    except Exception as e:
+        logger.error(f"Failed to write job state snapshot: {e}")
+
+
+def save_jobs_to_disk():
+    """
+    Append job state changes to JOBS_LOG (called on the persister thread)
+    
+    Only the active jobs and newly completed jobs are written, so a save costs
+    the same however long the completed history is.
+    """
+    global _jobs_log_file
+    
+    try:
+        with _jobs_save_lock:
+            with _jobs_lock:
+                finished = {job_id: record for job_id, record in completed_jobs.items() if job_id in _completed_dirty}
+                _completed_dirty.clear()
+                evicted = _take_evicted_jobs()
+                active = {job_id: dict(job) for job_id, job in active_jobs.items()}
+                cancelled = list(cancelled_jobs)
+            
+            try:
+                _archive_jobs(evicted)
+                lines = [dump_json_bytes({'op': 'evicted', 'job_id': job_id}) for job_id, _ in evicted]
+                lines.extend(dump_json_bytes({'op': 'completed', 'job_id': job_id, 'record': record})
+                             for job_id, record in finished.items())
+                lines.append(dump_json_bytes({
+                    'op': 'active',
+                    'active_jobs': active,
+                    'cancelled_jobs': cancelled,
+                    'timestamp': datetime.now().isoformat()
+                }))
+                if _jobs_log_file is None:
+                    _jobs_log_file = open(JOBS_LOG, 'ab')
+                _jobs_log_file.write(b'\n'.join(lines) + b'\n')
+                _jobs_log_file.flush()
+            except Exception:
+                # Keep them pending for the next save
+                with _jobs_lock:
+                    _completed_dirty.update(finished)
+                    _evicted_jobs.extend(evicted)
+                raise
+            
+            if _jobs_log_file.tell() > JOBS_LOG_MAX_BYTES:
+                _write_jobs_snapshot()
+        logger.info(f"Jobs saved to disk: {len(active)} active, {len(finished)} newly completed")
     except Exception as e:
         logger.error(f"Failed to save jobs to disk: {e}")
 
 
+def _persist_jobs_loop():
+    """
+    Background writer: one save per JOBS_SAVE_DELAY window however many changes it saw
+    
+    All encoding happens here, so neither request handlers nor the job thread
+    wait on it.
+    """
+    while True:
+        _jobs_dirty.wait()
+        _jobs_save_now.wait(JOBS_SAVE_DELAY)
+        _jobs_save_now.clear()
+        _jobs_dirty.clear()
+        save_jobs_to_disk()
+
+
+def schedule_jobs_save(immediate: bool = False):
+    """
+    Mark job state as changed; the persister thread writes it within JOBS_SAVE_DELAY seconds
+    
+    Args:
+        immediate: Write as soon as the persister wakes (terminal job transitions)
+    """
+    global _persister_thread
+    
+    if _persister_thread is None:
+        with _persister_lock:
+            if _persister_thread is None:
+                _persister_thread = threading.Thread(target=_persist_jobs_loop, name='jobs-persister', daemon=True)
+                _persister_thread.start()
+    if immediate:
+        _jobs_save_now.set()
+    _jobs_dirty.set()
+
+
+def store_upload(file_storage, destination: Path):
+    """
+    Move an uploaded file to its final path
+    
+    Uploads spooled by UploadRequest are hard-linked into place (the spool file is
+    removed when the request closes it); anything else falls back to a copy.
+    """
+    stream = file_storage.stream
+    spool_path = getattr(stream, 'name', None)
+    if isinstance(spool_path, str):
+        try:
+            stream.flush()
+            os.link(spool_path, destination)
+            return
+        except OSError:
+            pass
+    file_storage.save(str(destination))
+
+
 def load_jobs_from_disk():
-    """Load job state from disk on startup"""
+    """Load job state from disk on startup (snapshot plus change log)"""
     global active_jobs, completed_jobs, cancelled_jobs
     
     try:
+        has_log = JOBS_LOG.exists() and JOBS_LOG.stat().st_size > 0
+        if not JOBS_FILE.exists() and not has_log:
+            return False
+        
+        state = {}
         if JOBS_FILE.exists():
-            with open(JOBS_FILE, 'r') as f:
-                state = json.load(f)
-            
-            # Restore completed jobs
-            completed_jobs = state.get('completed_jobs', {})
-            
-            # Mark active jobs as interrupted (they won't resume)
-            old_active = state.get('active_jobs', {})
-            for job_id, job_data in old_active.items():
-                completed_jobs[job_id] = {
-                    'status': 'interrupted',
-                    'error': 'Server was redeployed while job was processing',
-                    'timestamp': datetime.now().isoformat(),
-                    'tasks': job_data.get('tasks', []),
-                    'original_data': job_data
-                }
-            
-            cancelled_jobs = set(state.get('cancelled_jobs', []))
-            
-            logger.info(f"Jobs loaded from disk: {len(completed_jobs)} total jobs, {len(old_active)} were interrupted")
-            
-            # Save updated state
-            save_jobs_to_disk()
-            
-            return True
+            with open(JOBS_FILE, 'rb') as f:
+                state = load_json_bytes(f.read())
+        
+        # Restore completed jobs
+        restored_jobs = OrderedDict(state.get('completed_jobs', {}))
+        old_active = state.get('active_jobs', {})
+        restored_cancelled = state.get('cancelled_jobs', [])
+        
+        # Replay changes made after the snapshot
+        if has_log:
+            with open(JOBS_LOG, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = load_json_bytes(line)
+                    except ValueError:
+                        # A crash mid-append leaves a partial last line
+                        break
+                    if entry.get('op') == 'completed':
+                        restored_jobs[entry['job_id']] = entry['record']
+                        restored_jobs.move_to_end(entry['job_id'])
+                    elif entry.get('op') == 'evicted':
+                        restored_jobs.pop(entry['job_id'], None)
+                    elif entry.get('op') == 'active':
+                        old_active = entry.get('active_jobs', {})
+                        restored_cancelled = entry.get('cancelled_jobs', [])
+        
+        # Mark active jobs as interrupted (they won't resume)
+        interrupted = 0
+        for job_id, job_data in old_active.items():
+            if job_id in restored_jobs:
+                continue
+            interrupted += 1
+            restored_jobs[job_id] = {
+                'status': 'interrupted',
+                'error': 'Server was redeployed while job was processing',
+                'timestamp': datetime.now().isoformat(),
+                'tasks': job_data.get('tasks', []),
+                'original_data': job_data
+            }
+        
+        # History from before the cap existed (or a lowered cap) goes to the archive
+        overflow = []
+        while len(restored_jobs) > MAX_COMPLETED_JOBS:
+            overflow.append(restored_jobs.popitem(last=False))
+        _archive_jobs(overflow)
+        
+        with _jobs_lock:
+            completed_jobs = restored_jobs
+            cancelled_jobs = set(restored_cancelled)
+            bump_jobs_version()
+        
+        logger.info(f"Jobs loaded from disk: {len(completed_jobs)} total jobs, {interrupted} were interrupted")
+        
+        # Fold the replayed log into a fresh snapshot
+        compact_jobs_state()
+        
+        return True
     except Exception as e:
         logger.error(f"Failed to load jobs from disk: {e}")
         return False
-    
-    return False
 
 
-class JobProcessor(threading.Thread):
-    """Background thread for processing video jobs"""
+@dataclass
+class JobSpec:
+    """A submitted job waiting in the work queue"""
+    job_id: str
+    video_url: str
+    subtitle_source: str  # Can be URL or file path
+    resolutions: list
+    use_soft_subtitle: bool
+    use_file: bool = False  # True if subtitle_source is a file path
+    dedup_key: tuple = None  # Entry in _inflight_jobs while this job is queued or running
+
+
+# Pending jobs, run by a fixed pool of long-lived worker threads (threads, not processes:
+# the heavy lifting happens in FFmpeg subprocesses, and progress/cancellation share job state)
+JOB_QUEUE_SIZE = 32
+MAX_CONCURRENT_JOBS = WEB_CONFIG['max_concurrent_jobs']
+_job_queue = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+_job_worker_lock = threading.Lock()
+_job_workers = []
+
+
+class JobProcessor:
+    """Runs one video job on a job worker thread"""
     
-    def __init__(self, job_id, video_url, subtitle_source, resolutions, use_soft_subtitle, use_file=False):
-        super().__init__()
-        self.job_id = job_id
-        self.video_url = video_url
-        self.subtitle_source = subtitle_source  # Can be URL or file path
-        self.resolutions = resolutions
-        self.use_soft_subtitle = use_soft_subtitle
-        self.use_file = use_file  # True if subtitle_source is a file path
-        self.pipeline = VideoProcessingPipeline()
+    def __init__(self, spec: JobSpec):
+        self.job_id = spec.job_id
+        self.video_url = spec.video_url
+        self.subtitle_source = spec.subtitle_source
+        self.resolutions = spec.resolutions
+        self.use_soft_subtitle = spec.use_soft_subtitle
+        self.use_file = spec.use_file
+        self.dedup_key = spec.dedup_key
         self.cancelled = False
+        self.task_status = ['pending'] * len(TASK_NAMES)
+        self._last_progress_ts = 0.0
+        self._last_progress_key = None
     
     def update_progress(self, task, current, total, task_status='in-progress', speed=0, eta=0):
-        """Update job progress"""
-        if self.job_id in active_jobs:
-            active_jobs[self.job_id]['progress'] = {
-                'task': task,
-                'current': current,
-                'total': total,
-                'percentage': int((current / total * 100) if total > 0 else 0),
-                'task_status': task_status,
-                'speed': speed,  # bytes per second
-                'eta': eta  # seconds remaining
-            }
+        """
+        Update job progress, at most once per PROGRESS_UPDATE_INTERVAL within one step
+        
+        The step is the task list state, not the task text (which can carry a
+        changing ETA); a new step, a task_status change or a finished count always
+        goes out, so clients never stall short of 100%.
+        """
+        now = time.monotonic()
+        progress_key = (tuple(self.task_status), task_status)
+        if (current < total and progress_key == self._last_progress_key
+                and now - self._last_progress_ts < PROGRESS_UPDATE_INTERVAL):
+            return
+        self._last_progress_ts = now
+        self._last_progress_key = progress_key
+        
+        self._update_job(progress={
+            'task': task,
+            'current': current,
+            'total': total,
+            'percentage': int((current / total * 100) if total > 0 else 0),
+            'task_status': task_status,
+            'speed': speed,  # bytes per second
+            'eta': eta  # seconds remaining
+        })
+    
+    def task_list(self):
+        """Tasks in the API shape ([{'name', 'status'}, ...])"""
+        return [{'name': name, 'status': status} for name, status in zip(TASK_NAMES, self.task_status)]
     
-    def update_task_list(self, tasks):
-        """Update task list for the job"""
-        if self.job_id in active_jobs:
-            active_jobs[self.job_id]['tasks'] = tasks
+    def update_task_list(self, status, *indices):
+        """Set the status of the given TASK_NAMES entries"""
+        for index in indices:
+            self.task_status[index] = status
+        
+        with _jobs_lock:
+            job = active_jobs.get(self.job_id)
+            if job is None:
+                return
+            # Replace the list rather than editing it: readers serialize shallow snapshots
+            tasks = list(job.get('tasks') or self.task_list())
+            for index in indices:
+                tasks[index] = {'name': TASK_NAMES[index], 'status': status}
+            job['tasks'] = tasks
+            bump_jobs_version()
+        schedule_jobs_save()
+    
+    def _update_job(self, **fields) -> bool:
+        """Set fields on this job's active entry; False if it is no longer active"""
+        with _jobs_lock:
+            job = active_jobs.get(self.job_id)
+            if job is None:
+                return False
+            job.update(fields)
+            bump_jobs_version()
+            return True
     
     def check_cancelled(self):
-        """Check if job was cancelled"""
-        return self.job_id in cancelled_jobs
+        """Check if job was cancelled (sticky: once True, later checks skip the set lookup)"""
+        if not self.cancelled and self.job_id in cancelled_jobs:
+            self.cancelled = True
+        return self.cancelled
     
     def run(self):
         """Execute the processing job"""
-        global current_running_job
-        
         try:
             # Mark this job as currently running
-            current_running_job = self.job_id
-            
-            # Initialize tasks
-            tasks = [
-                {'name': 'Download Video', 'status': 'pending'},
-                {'name': 'Download/Upload Subtitle', 'status': 'pending'},
-                {'name': 'Process Subtitles', 'status': 'pending'},
-                {'name': 'Encode Videos', 'status': 'pending'}
-            ]
+            with _jobs_lock:
+                running_jobs[self.job_id] = time.time()
+                bump_jobs_version()
             
-            active_jobs[self.job_id]['status'] = 'processing'
-            active_jobs[self.job_id]['stage'] = 'Initializing'
-            self.update_task_list(tasks)
+            self._update_job(status='processing', stage='Initializing', tasks=self.task_list())
+            schedule_jobs_save()
             
             if self.check_cancelled():
-                raise Exception("Job cancelled by user")
+                raise JobCancelled()
             
             if self.use_file:
                 # Process with uploaded file
-                from downloader import Downloader
-                from pathlib import Path
-                
                 downloader = Downloader()
                 
                 # Download video
-                tasks[0]['status'] = 'in-progress'
-                self.update_task_list(tasks)
-                active_jobs[self.job_id]['stage'] = 'Downloading video'
+                self.update_task_list('in-progress', 0)
+                self._update_job(stage='Downloading video')
                 self.update_progress('Downloading video', 0, 100)
                 
                 video_path = downloader.download_file_with_progress(
@@ -169,29 +626,24 @@ class JobProcessor(threading.Thread):
                 )
                 
                 if self.check_cancelled():
-                    raise Exception("Job cancelled by user")
+                    raise JobCancelled()
                 
-                tasks[0]['status'] = 'completed'
-                tasks[1]['status'] = 'completed'  # Subtitle already uploaded
-                self.update_task_list(tasks)
+                self.update_task_list('completed', 0, 1)  # Subtitle already uploaded
                 
                 # Subtitle is already uploaded
                 subtitle_path = Path(self.subtitle_source)
                 
                 # Continue with subtitle processing
-                from subtitle_processor import SubtitleProcessor
                 processor = SubtitleProcessor()
                 
                 if self.check_cancelled():
-                    raise Exception("Job cancelled by user")
+                    raise JobCancelled()
                 
-                tasks[2]['status'] = 'in-progress'
-                self.update_task_list(tasks)
-                active_jobs[self.job_id]['stage'] = 'Processing subtitles'
+                self.update_task_list('in-progress', 2)
+                self._update_job(stage='Processing subtitles')
                 
                 # Show initial progress immediately
                 self.update_progress('Processing subtitles (this may take several minutes)', 10, 100, 'in-progress')
-                import time
                 time.sleep(0.5)  # Small delay to ensure UI updates
                 
                 self.update_progress('Burning subtitles into video frames', 30, 100, 'in-progress')
@@ -212,42 +664,33 @@ class JobProcessor(threading.Thread):
                 )
                 
                 self.update_progress('Processing subtitles', 100, 100, 'completed')
-                tasks[2]['status'] = 'completed'
-                self.update_task_list(tasks)
+                self.update_task_list('completed', 2)
                 
                 # Encode to multiple resolutions
-                from video_encoder import VideoEncoder
                 encoder = VideoEncoder()
                 
                 if self.check_cancelled():
-                    raise Exception("Job cancelled by user")
+                    raise JobCancelled()
                 
-                tasks[3]['status'] = 'in-progress'
-                self.update_task_list(tasks)
-                active_jobs[self.job_id]['stage'] = 'Encoding videos'
+                self.update_task_list('in-progress', 3)
+                self._update_job(stage='Encoding videos')
                 
-                output_files = {}
-                total_resolutions = len(self.resolutions)
-                for idx, resolution in enumerate(self.resolutions):
-                    if self.check_cancelled():
-                        raise Exception("Job cancelled by user")
-                    
-                    # Show progress for current encoding
-                    current_percentage = int((idx / total_resolutions) * 100)
-                    self.update_progress(f'Encoding {resolution}', current_percentage, 100, 'in-progress')
-                    
-                    output_files[resolution] = encoder.encode_resolution(
-                        processed_video,
-                        resolution,
-                        cancel_check=self.check_cancelled
+                # One decode feeds every rung; progress follows -progress output
+                output_files = encoder.encode_all_resolutions(
+                    processed_video,
+                    self.resolutions,
+                    cancel_check=self.check_cancelled,
+                    progress_callback=lambda current, total: self.update_progress(
+                        'Encoding videos', int(current * 100 / total) if total else 0, 100, 'in-progress'
                     )
-                    
-                    # Update after completion of this resolution
-                    completed_percentage = int(((idx + 1) / total_resolutions) * 100)
-                    self.update_progress(f'Encoding videos', completed_percentage, 100, 'in-progress')
+                )
+                if self.check_cancelled():
+                    raise JobCancelled()
+                if not output_files:
+                    raise EncodingError("No resolutions were encoded")
+                self.update_progress('Encoding videos', 100, 100, 'in-progress')
                 
-                tasks[3]['status'] = 'completed'
-                self.update_task_list(tasks)
+                self.update_task_list('completed', 3)
                 
                 results = {
                     'job_id': self.job_id,
@@ -258,8 +701,9 @@ class JobProcessor(threading.Thread):
                     'total_output_files': len(output_files)
                 }
             else:
-                # Original URL-based processing
-                results = self.pipeline.process_video(
+                # Original URL-based processing (the only path that needs the full pipeline)
+                pipeline = VideoProcessingPipeline()
+                results = pipeline.process_video(
                     self.video_url,
                     self.subtitle_source,
                     self.resolutions,
@@ -267,74 +711,193 @@ class JobProcessor(threading.Thread):
                 )
             
             # Mark all tasks completed
-            for task in tasks:
-                task['status'] = 'completed'
-            self.update_task_list(tasks)
+            self.update_task_list('completed', *range(len(TASK_NAMES)))
             self.update_progress('Completed', 100, 100, 'completed')
             
             # Move to completed jobs with output file info
-            completed_jobs[self.job_id] = {
-                'status': 'completed',
-                'results': results,
-                'timestamp': datetime.now().isoformat(),
-                'tasks': tasks,
-                'output_files': results.get('output_files', {})
-            }
-            
-            if self.job_id in active_jobs:
-                del active_jobs[self.job_id]
-            
-            # Clear running job marker
-            current_running_job = None
+            with _jobs_lock:
+                add_completed_job(self.job_id, {
+                    'status': 'completed',
+                    'results': results,
+                    'timestamp': datetime.now().isoformat(),
+                    'tasks': self.task_list(),
+                    'output_files': results.get('output_files', {})
+                })
+                active_jobs.pop(self.job_id, None)
+                
+                # Clear running job marker
+                running_jobs.pop(self.job_id, None)
+                release_inflight(self.dedup_key, self.job_id)
             
-            # Save state to disk
-            save_jobs_to_disk()
+            # Terminal transition: skip the coalescing delay
+            schedule_jobs_save(immediate=True)
                 
         except Exception as e:
             logger.error(f"Job {self.job_id} failed: {e}")
             
-            is_cancelled = 'cancelled' in str(e).lower()
-            
-            completed_jobs[self.job_id] = {
-                'status': 'cancelled' if is_cancelled else 'failed',
-                'error': str(e),
-                'timestamp': datetime.now().isoformat(),
-                'tasks': tasks if 'tasks' in locals() else []
-            }
-            
-            if self.job_id in active_jobs:
-                del active_jobs[self.job_id]
+            # Components abort with their own error types when cancel_check fires
+            is_cancelled = isinstance(e, JobCancelled) or self.cancelled
             
-            if self.job_id in cancelled_jobs:
-                cancelled_jobs.remove(self.job_id)
-            
-            # Clear running job marker
-            current_running_job = None
+            with _jobs_lock:
+                add_completed_job(self.job_id, {
+                    'status': 'cancelled' if is_cancelled else 'failed',
+                    'error': str(e),
+                    'timestamp': datetime.now().isoformat(),
+                    'tasks': self.task_list()
+                })
+                active_jobs.pop(self.job_id, None)
+                cancelled_jobs.discard(self.job_id)
+                
+                # Clear running job marker
+                running_jobs.pop(self.job_id, None)
+                release_inflight(self.dedup_key, self.job_id)
             
-            # Save state to disk
-            save_jobs_to_disk()
+            # Terminal transition: skip the coalescing delay
+            schedule_jobs_save(immediate=True)
+
+
+def _job_worker_loop():
+    """Take jobs off the queue and run them one after another"""
+    while True:
+        spec = _job_queue.get()
+        try:
+            JobProcessor(spec).run()
+        except Exception as e:
+            # run() records its own failures; this only catches setup errors
+            logger.error(f"Job {spec.job_id} could not be started: {e}")
+            with _jobs_lock:
+                release_inflight(spec.dedup_key, spec.job_id)
+                if active_jobs.pop(spec.job_id, None) is not None:
+                    add_completed_job(spec.job_id, {
+                        'status': 'failed',
+                        'error': str(e),
+                        'timestamp': datetime.now().isoformat(),
+                        'tasks': []
+                    })
+            schedule_jobs_save(immediate=True)
+        finally:
+            _job_queue.task_done()
+
+
+def job_dedup_key(video_url, subtitle_url, resolutions, use_soft_subtitle) -> tuple:
+    """Identity of a URL job: submissions with the same key produce the same outputs"""
+    return (video_url, subtitle_url, tuple(sorted(resolutions or ())), bool(use_soft_subtitle))
+
+
+def release_inflight(dedup_key, job_id):
+    """Forget a finished job's dedup entry (caller holds _jobs_lock)"""
+    if dedup_key is not None and _inflight_jobs.get(dedup_key) == job_id:
+        del _inflight_jobs[dedup_key]
+
+
+def enqueue_job(spec: JobSpec, job_entry: dict) -> bool:
+    """
+    Register a job and queue it for the worker threads
+    
+    Returns:
+        False (and nothing registered) if the queue is full
+    """
+    if len(_job_workers) < MAX_CONCURRENT_JOBS:
+        with _job_worker_lock:
+            while len(_job_workers) < MAX_CONCURRENT_JOBS:
+                worker = threading.Thread(target=_job_worker_loop, name=f'job-worker-{len(_job_workers)}', daemon=True)
+                worker.start()
+                _job_workers.append(worker)
+    
+    # The entry must exist before the worker can pick the job up
+    with _jobs_lock:
+        active_jobs[spec.job_id] = job_entry
+        bump_jobs_version()
+    try:
+        _job_queue.put_nowait(spec)
+    except queue.Full:
+        with _jobs_lock:
+            active_jobs.pop(spec.job_id, None)
+            bump_jobs_version()
+        return False
+    return True
+
+
+def queue_full_response():
+    """409 response for submissions while the job queue is full"""
+    with _jobs_lock:
+        running_job_id = next(iter(running_jobs), None)
+    return jsonify({
+        'success': False,
+        'error': f'The job queue is full ({JOB_QUEUE_SIZE} jobs). Please try again later.',
+        'running_job_id': running_job_id
+    }), 409  # Conflict status
+
+
+def invalid_resolutions_response(resolutions):
+    """400 response unless resolutions is a non-empty list of known names, else None"""
+    if not isinstance(resolutions, list) or not resolutions:
+        error = 'At least one resolution is required'
+    else:
+        unknown = [str(res) for res in resolutions if not isinstance(res, str) or res not in RESOLUTIONS]
+        if not unknown:
+            return None
+        error = f"Unknown resolution: {', '.join(unknown)}. Allowed: {', '.join(RESOLUTIONS)}"
+    return jsonify({
+        'success': False,
+        'error': error
+    }), 400
+
+
+def not_modified(etag: str):
+    """Empty 304 if the client's If-None-Match already has etag, else None"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
+
+
+def tagged_json(data, etag: str):
+    """jsonify data with an ETag the client must revalidate on every poll"""
+    response = jsonify(data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# /api/events streams (see job_events)
+EVENT_STREAM_LIMIT = max(1, WEB_CONFIG['server_threads'] // 2)
+EVENT_STREAM_MAX_SECONDS = 300
+EVENT_STREAM_KEEPALIVE = 15.0
+EVENT_STREAM_RETRY_MS = 2000
+_event_streams = threading.BoundedSemaphore(EVENT_STREAM_LIMIT)
+
+# index.html takes no variables: rendered once, then served as bytes (see index)
+_index_page = None
 
 
 @app.route('/')
 def index():
     """Render main page"""
-    return render_template('index.html')
+    global _index_page
+    
+    # Re-render in debug mode so template edits show up
+    if _index_page is None or app.debug:
+        body = render_template('index.html').encode('utf-8')
+        _index_page = (body, hashlib.sha256(body).hexdigest()[:16])
+    body, etag = _index_page
+    
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/api/submit', methods=['POST'])
 def submit_job():
     """Submit a new processing job"""
-    global current_running_job
-    
     try:
-        # Check if a job is already running
-        if current_running_job is not None:
-            return jsonify({
-                'success': False,
-                'error': 'A job is already running. Please wait for it to complete or cancel it first.',
-                'running_job_id': current_running_job
-            }), 409  # Conflict status
-        
         data = request.json
         
         video_url = data.get('video_url')
@@ -349,28 +912,46 @@ def submit_job():
                 'error': 'Both video and subtitle URLs are required'
             }), 400
         
-        # Generate job ID
-        from main import VideoProcessingPipeline
-        temp_pipeline = VideoProcessingPipeline()
-        job_id = temp_pipeline.generate_job_id()
+        invalid = invalid_resolutions_response(resolutions)
+        if invalid is not None:
+            return invalid
         
-        # Create job entry
-        active_jobs[job_id] = {
-            'status': 'queued',
-            'video_url': video_url,
-            'subtitle_url': subtitle_url,
-            'resolutions': resolutions,
-            'soft_subtitle': use_soft_subtitle,
-            'timestamp': datetime.now().isoformat(),
-            'stage': 'Queued'
-        }
+        dedup_key = job_dedup_key(video_url, subtitle_url, resolutions, use_soft_subtitle)
         
-        # Start processing thread
-        processor = JobProcessor(job_id, video_url, subtitle_url, resolutions, use_soft_subtitle)
-        processor.start()
+        with _jobs_lock:
+            # The same job is already queued or running (double submit, second tab): share it
+            existing_id = _inflight_jobs.get(dedup_key)
+            if existing_id is not None and existing_id not in cancelled_jobs:
+                return jsonify({
+                    'success': True,
+                    'job_id': existing_id,
+                    'deduplicated': True,
+                    'message': 'An identical job is already in progress'
+                })
+            
+            # Generate job ID (no pipeline instance: that validates config and builds every component)
+            job_id = VideoProcessingPipeline.generate_job_id()
+            
+            # Create job entry
+            job_entry = {
+                'status': 'queued',
+                'video_url': video_url,
+                'subtitle_url': subtitle_url,
+                'resolutions': resolutions,
+                'soft_subtitle': use_soft_subtitle,
+                'timestamp': datetime.now().isoformat(),
+                'stage': 'Queued'
+            }
+            
+            # Queue for the job worker (registered before the lock is released, so an
+            # identical submission racing this one sees it)
+            spec = JobSpec(job_id, video_url, subtitle_url, resolutions, use_soft_subtitle, dedup_key=dedup_key)
+            if not enqueue_job(spec, job_entry):
+                return queue_full_response()
+            _inflight_jobs[dedup_key] = job_id
         
-        # Save state to disk
-        save_jobs_to_disk()
+        # Save state to disk (coalesced; the job's own terminal save is immediate)
+        schedule_jobs_save()
         
         return jsonify({
             'success': True,
@@ -389,21 +970,28 @@ def submit_job():
 @app.route('/api/submit_with_file', methods=['POST'])
 def submit_job_with_file():
     """Submit a new processing job with uploaded subtitle file"""
-    global current_running_job
-    
     try:
-        # Check if a job is already running
-        if current_running_job is not None:
-            return jsonify({
-                'success': False,
-                'error': 'A job is already running. Please wait for it to complete or cancel it first.',
-                'running_job_id': current_running_job
-            }), 409  # Conflict status
+        # Refuse before receiving the upload
+        if _job_queue.full():
+            return queue_full_response()
         
-        video_url = request.form.get('video_url')
-        subtitle_file = request.files.get('subtitle_file')
-        resolutions = json.loads(request.form.get('resolutions', '["360p", "480p", "720p", "1080p"]'))
-        use_soft_subtitle = request.form.get('soft_subtitle', 'true').lower() == 'true'
+        # Raw uploads send the subtitle as the whole body (filename in X-Filename or ?filename=)
+        # and the other fields in the query string; the body is streamed to disk unparsed
+        raw_upload = request.mimetype == 'application/octet-stream'
+        if raw_upload:
+            fields = request.args
+            subtitle_file = None
+            original_filename = request.headers.get('X-Filename') or request.args.get('filename', '')
+            if not request.content_length:
+                original_filename = ''
+        else:
+            fields = request.form
+            subtitle_file = request.files.get('subtitle_file')
+            original_filename = subtitle_file.filename if subtitle_file else ''
+        
+        video_url = fields.get('video_url')
+        resolutions = json.loads(fields.get('resolutions', '["360p", "480p", "720p", "1080p"]'))
+        use_soft_subtitle = fields.get('soft_subtitle', 'true').lower() == 'true'
         
         # Validate inputs
         if not video_url:
@@ -412,34 +1000,42 @@ def submit_job_with_file():
                 'error': 'Video URL is required'
             }), 400
         
-        if not subtitle_file:
+        invalid = invalid_resolutions_response(resolutions)
+        if invalid is not None:
+            return invalid
+        
+        if not original_filename:
             return jsonify({
                 'success': False,
                 'error': 'Subtitle file is required'
             }), 400
         
         # Validate file extension
-        filename = secure_filename(subtitle_file.filename)
-        file_ext = Path(filename).suffix.lower()
+        filename = secure_filename(original_filename)
+        file_ext = os.path.splitext(filename)[1].lower()
         
         if file_ext not in ALLOWED_EXTENSIONS:
             return jsonify({
                 'success': False,
-                'error': f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'
+                'error': f'Invalid file type. Allowed: {ALLOWED_EXTENSIONS_TEXT}'
             }), 400
         
-        # Save uploaded file
-        from main import VideoProcessingPipeline
-        temp_pipeline = VideoProcessingPipeline()
-        job_id = temp_pipeline.generate_job_id()
+        # Save uploaded file. The body has to be consumed while the request is open (WSGI
+        # servers discard it afterwards), so this stays here; multipart uploads were already
+        # spooled to disk by the form parser and are only hard-linked into place
+        job_id = VideoProcessingPipeline.generate_job_id()
         
         subtitle_path = DIRS['downloads'] / f"{job_id}_{filename}"
-        subtitle_file.save(str(subtitle_path))
+        if raw_upload:
+            with open(subtitle_path, 'wb') as f:
+                shutil.copyfileobj(request.stream, f, UPLOAD_CHUNK_SIZE)
+        else:
+            store_upload(subtitle_file, subtitle_path)
         
         logger.info(f"Subtitle file uploaded: {subtitle_path}")
         
         # Create job entry
-        active_jobs[job_id] = {
+        job_entry = {
             'status': 'queued',
             'video_url': video_url,
             'subtitle_file': str(subtitle_path),
@@ -449,12 +1045,14 @@ def submit_job_with_file():
             'stage': 'Queued'
         }
         
-        # Start processing thread with file path instead of URL
-        processor = JobProcessor(job_id, video_url, str(subtitle_path), resolutions, use_soft_subtitle, use_file=True)
-        processor.start()
+        # Queue for the job worker with file path instead of URL
+        spec = JobSpec(job_id, video_url, str(subtitle_path), resolutions, use_soft_subtitle, use_file=True)
+        if not enqueue_job(spec, job_entry):
+            subtitle_path.unlink(missing_ok=True)
+            return queue_full_response()
         
-        # Save state to disk
-        save_jobs_to_disk()
+        # Save state to disk (coalesced; the job's own terminal save is immediate)
+        schedule_jobs_save()
         
         return jsonify({
             'success': True,
@@ -470,24 +1068,54 @@ def submit_job_with_file():
         }), 500
 
 
-@app.route('/api/status/<job_id>')
-def job_status(job_id):
-    """Get status of a specific job"""
+def get_job_status(job_id):
+    """/api/status payload for job_id, or None if the job is unknown (caller holds _jobs_lock)"""
     # Check active jobs
-    if job_id in active_jobs:
-        return jsonify({
+    active = active_jobs.get(job_id)
+    if active is not None:
+        return {
             'job_id': job_id,
             'status': 'active',
-            'details': active_jobs[job_id]
-        })
+            'details': dict(active)
+        }
     
     # Check completed jobs
-    if job_id in completed_jobs:
-        return jsonify({
+    completed = completed_jobs.get(job_id)
+    if completed is not None:
+        return {
             'job_id': job_id,
             'status': 'completed',
-            'details': completed_jobs[job_id]
-        })
+            'details': completed
+        }
+    return None
+
+
+def get_archived_job_status(job_id):
+    """/api/status payload for a job that only lives in JOBS_ARCHIVE, or None"""
+    archived = load_archived_job(job_id)
+    if archived is None:
+        return None
+    return {
+        'job_id': job_id,
+        'status': 'completed',
+        'details': archived,
+        'archived': True
+    }
+
+
+@app.route('/api/status/<job_id>')
+def job_status(job_id):
+    """Get status of a specific job"""
+    with _jobs_lock:
+        status = get_job_status(job_id)
+    
+    if status is not None:
+        return jsonify(status)
+    
+    # Older jobs only live in the archive
+    archived = get_archived_job_status(job_id)
+    if archived is not None:
+        return jsonify(archived)
     
     return jsonify({
         'job_id': job_id,
@@ -496,21 +1124,87 @@ def job_status(job_id):
     }), 404
 
 
+@app.route('/api/events/<job_id>')
+def job_events(job_id):
+    """
+    Server-Sent Events stream of /api/status payloads for one job
+    
+    An event is sent whenever the job changes, instead of the client polling.
+    The stream ends when the job finishes (archived jobs get their final state
+    once), or after EVENT_STREAM_MAX_SECONDS
+    (EventSource reconnects by itself). Each open stream holds a request thread,
+    so at most EVENT_STREAM_LIMIT run at once; past that the client gets 503 and
+    should fall back to polling /api/status.
+    """
+    if not _event_streams.acquire(blocking=False):
+        return jsonify({'error': 'Too many event streams, poll /api/status instead'}), 503
+    
+    def generate():
+        deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+        seen_version = None
+        last_payload = None
+        yield f"retry: {EVENT_STREAM_RETRY_MS}\n\n"
+        
+        while time.monotonic() < deadline:
+            with _jobs_changed:
+                if _jobs_version == seen_version:
+                    _jobs_changed.wait(EVENT_STREAM_KEEPALIVE)
+                changed = _jobs_version != seen_version
+                seen_version = _jobs_version
+                status = get_job_status(job_id) if changed else None
+            
+            if not changed:
+                yield ": keepalive\n\n"
+                continue
+            if status is None:
+                # Evicted from memory: the archived record is final, so send it once and stop
+                status = get_archived_job_status(job_id)
+                if status is None:
+                    yield "event: not_found\ndata: {}\n\n"
+                    return
+            
+            # Other jobs' changes wake this stream too; only send this job's
+            payload = dump_json_bytes(status)
+            if payload != last_payload:
+                last_payload = payload
+                yield f"data: {payload.decode('utf-8')}\n\n"
+            if status['status'] == 'completed':
+                return
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    # The server calls this whether or not the stream was ever iterated
+    response.call_on_close(_event_streams.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass each event straight through
+    return response
+
+
 @app.route('/api/jobs/all')
 def get_all_jobs():
     """Get all jobs (active and completed)"""
+    # Polled continuously; skip building the list when nothing changed since the last poll.
+    # The version is read once, under the same lock as the snapshot, so the ETag matches the body
+    with _jobs_lock:
+        etag = str(_jobs_version)
+        cached = not_modified(etag)
+        if cached is None:
+            active = [(job_id, dict(job_data)) for job_id, job_data in active_jobs.items()]
+            completed = list(completed_jobs.items())
+    if cached is not None:
+        return cached
+    
     all_jobs = []
     
     # Add active jobs
-    for job_id, job_data in active_jobs.items():
+    for job_id, job_data in active:
         all_jobs.append({
             'job_id': job_id,
             'status': 'active',
             'details': job_data
         })
     
-    # Add completed jobs
-    for job_id, job_data in completed_jobs.items():
+    # Add completed jobs (only the most recent MAX_COMPLETED_JOBS; older ones: /api/jobs/archive)
+    for job_id, job_data in completed:
         all_jobs.append({
             'job_id': job_id,
             'status': job_data.get('status', 'completed'),
@@ -520,22 +1214,46 @@ def get_all_jobs():
     # Sort by timestamp (newest first)
     all_jobs.sort(key=lambda x: x['details'].get('timestamp', ''), reverse=True)
     
-    return jsonify({
+    return tagged_json({
         'success': True,
         'jobs': all_jobs,
         'total': len(all_jobs),
-        'active_count': len(active_jobs),
-        'completed_count': len(completed_jobs)
+        'active_count': len(active),
+        'completed_count': len(completed),
+        'completed_limit': MAX_COMPLETED_JOBS
+    }, etag)
+
+
+@app.route('/api/jobs/archive')
+def get_archived_jobs():
+    """Page through jobs older than the in-memory history (?limit=&offset=)"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    total, jobs = list_archived_jobs(limit, offset)
+    return jsonify({
+        'success': True,
+        'jobs': [{'job_id': job_id, 'status': job_data.get('status', 'completed'), 'details': job_data}
+                 for job_id, job_data in jobs],
+        'total': total,
+        'limit': limit,
+        'offset': offset
     })
 
 
 @app.route('/api/jobs/cancel/<job_id>', methods=['POST'])
 def cancel_job(job_id):
     """Cancel an active job"""
-    if job_id in active_jobs:
-        cancelled_jobs.add(job_id)
-        active_jobs[job_id]['status'] = 'cancelling'
-        active_jobs[job_id]['stage'] = 'Cancelling...'
+    with _jobs_lock:
+        job = active_jobs.get(job_id)
+        if job is not None:
+            cancelled_jobs.add(job_id)
+            job['status'] = 'cancelling'
+            job['stage'] = 'Cancelling...'
+            bump_jobs_version()
+    
+    if job is not None:
+        schedule_jobs_save()
         
         return jsonify({
             'success': True,
@@ -548,121 +1266,205 @@ def cancel_job(job_id):
         }), 404
 
 
+def get_output_file(job_id, resolution):
+    """Path of a completed job's output for resolution, or None if it is missing"""
+    with _jobs_lock:
+        job_data = completed_jobs.get(job_id)
+    if job_data is None:
+        job_data = load_archived_job(job_id)
+        if job_data is None:
+            return None
+    
+    output_files = job_data.get('output_files') or job_data.get('results', {}).get('output_files', {})
+    file_path = output_files.get(resolution)
+    if file_path and os.path.exists(file_path):
+        return file_path
+    return None
+
+
+def send_protected_file(file_path, as_attachment: bool, mimetype='video/mp4'):
+    """
+    Serve a file under BASE_DIR without holding a worker for the transfer when a
+    front server can do it: nginx via X-Accel-Redirect (accel_redirect_prefix) or
+    X-Sendfile (use_x_sendfile, handled by send_file itself)
+    """
+    file_name = os.path.basename(file_path)
+    
+    accel_prefix = WEB_CONFIG.get('accel_redirect_prefix')
+    if accel_prefix:
+        # nginx serves the file itself (sendfile, Range) from its internal location
+        relative_path = Path(file_path).resolve().relative_to(DIRS['outputs'].parent)
+        response = Response(mimetype=mimetype or mimetypes.guess_type(file_name)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(relative_path.as_posix())}"
+        if as_attachment:
+            # RFC 5987 form: download names may be non-ASCII or contain quotes
+            response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(file_name)}"
+        return response
+    
+    # Given a path, send_file stats it once for Content-Length, Last-Modified and the ETag, and
+    # returns wsgi.file_wrapper so the server streams the file (gunicorn: sendfile(2), waitress:
+    # its I/O loop) instead of a Python loop. conditional=True answers Range requests.
+    return send_file(
+        file_path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=file_name if as_attachment else None,
+        conditional=True,
+        etag=True
+    )
+
+
 @app.route('/api/download/<job_id>/<resolution>')
 def download_video(job_id, resolution):
-    """Download a processed video file"""
-    if job_id in completed_jobs:
-        job_data = completed_jobs[job_id]
-        if 'output_files' in job_data:
-            file_path = job_data['output_files'].get(resolution)
-            if file_path and os.path.exists(file_path):
-                return send_file(
-                    file_path,
-                    as_attachment=True,
-                    download_name=os.path.basename(file_path)
-                )
+    """
+    Download a processed video file
     
-    return jsonify({'error': 'File not found'}), 404
+    Resumable: send_file(conditional=True) answers Range requests with 206 and
+    advertises Accept-Ranges, and Flask serves HEAD for this GET route, so clients
+    can probe the size (nginx does both itself under X-Accel-Redirect).
+    """
+    file_path = get_output_file(job_id, resolution)
+    if file_path is None:
+        return jsonify({'error': 'File not found'}), 404
+    return send_protected_file(file_path, as_attachment=True)
 
 
 @app.route('/api/stream/<job_id>/<resolution>')
 def stream_video(job_id, resolution):
     """Stream a processed video file"""
-    if job_id in completed_jobs:
-        job_data = completed_jobs[job_id]
-        if 'output_files' in job_data:
-            file_path = job_data['output_files'].get(resolution)
-            if file_path and os.path.exists(file_path):
-                return send_file(
-                    file_path,
-                    mimetype='video/mp4',
-                    as_attachment=False
-                )
-    
-    return jsonify({'error': 'File not found'}), 404
+    file_path = get_output_file(job_id, resolution)
+    if file_path is None:
+        return jsonify({'error': 'File not found'}), 404
+    return send_protected_file(file_path, as_attachment=False)
 
 
 @app.route('/api/jobs')
 def list_jobs():
     """List all jobs"""
+    with _jobs_lock:
+        active = {job_id: dict(job_data) for job_id, job_data in active_jobs.items()}
+        completed = dict(completed_jobs)
+    
     return jsonify({
-        'active': active_jobs,
-        'completed': completed_jobs
+        'active': active,
+        'completed': completed
     })
 
 
-@app.route('/api/download/<job_id>/<resolution>')
-def download_file(job_id, resolution):
-    """Download processed video file"""
-    if job_id not in completed_jobs:
-        return jsonify({'error': 'Job not found'}), 404
-    
-    job = completed_jobs[job_id]
+def _browse_cache_key():
+    """Modification times of the browsed directories (and each resolution folder)"""
+    key = []
+    for directory in (DIRS['downloads'], DIRS['outputs']):
+        try:
+            key.append(directory.stat().st_mtime_ns)
+        except OSError:
+            key.append(None)
+    if DIRS['outputs'].exists():
+        # Files land in outputs/<resolution>/, which does not touch outputs/ itself
+        with os.scandir(DIRS['outputs']) as entries:
+            key.extend((entry.name, entry.stat().st_mtime_ns) for entry in entries if entry.is_dir())
+    return tuple(key)
+
+
+def _list_files(directory: Path):
+    """File entries of one directory, using the stat data os.scandir already has"""
+    relative_dir = os.path.relpath(directory, DIRS['downloads'].parent)
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # Skip in-flight upload spool files (see UploadRequest)
+            if not entry.is_file(follow_symlinks=False) or entry.name.startswith('.upload_'):
+                continue
+            stat = entry.stat()
+            files.append({
+                'name': entry.name,
+                'size': stat.st_size,
+                'size_mb': round(stat.st_size / _MB, 2),
+                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                'path': os.path.join(relative_dir, entry.name)
+            })
+    return files
+
+
+def _build_files_info():
+    """List downloads and outputs with sizes and modification times"""
+    files_info = {
+        'downloads': [],
+        'outputs': {},
+        'total_size': 0
+    }
     
-    if job['status'] != 'completed':
-        return jsonify({'error': 'Job not completed'}), 400
+    # List downloads folder
+    if DIRS['downloads'].exists():
+        files_info['downloads'] = _list_files(DIRS['downloads'])
+        files_info['total_size'] += sum(f['size'] for f in files_info['downloads'])
     
-    output_files = job['results'].get('output_files', {})
+    # List outputs folder by resolution
+    if DIRS['outputs'].exists():
+        with os.scandir(DIRS['outputs']) as entries:
+            resolution_dirs = [entry.name for entry in entries if entry.is_dir()]
+        for resolution in resolution_dirs:
+            resolution_files = _list_files(DIRS['outputs'] / resolution)
+            files_info['total_size'] += sum(f['size'] for f in resolution_files)
+            files_info['outputs'][resolution] = resolution_files
     
-    if resolution not in output_files:
-        return jsonify({'error': 'Resolution not found'}), 404
+    files_info['total_size_mb'] = round(files_info['total_size'] / _MB, 2)
+    files_info['total_size_gb'] = round(files_info['total_size'] / _GB, 2)
+    return files_info
+
+
+def _refresh_files_info():
+    """Rebuild the browse listing and store it in _browse_cache"""
+    key = _browse_cache_key()
+    files_info = _build_files_info()
+    with _browse_cache_lock:
+        _browse_cache.update(key=key, value=files_info, time=time.monotonic())
+    return files_info
+
+
+def _browse_refresh_loop():
+    """Keep the listing (and in-progress file sizes) fresh while the dashboard is being polled"""
+    global _browse_refresher
+    while True:
+        time.sleep(BROWSE_CACHE_TTL)
+        with _browse_cache_lock:
+            if time.monotonic() - _browse_cache['requested'] > BROWSE_IDLE_SECONDS:
+                _browse_refresher = None
+                return
+        try:
+            _refresh_files_info()
+        except Exception as e:
+            logger.warning(f"Failed to refresh file listing: {e}")
+
+
+def get_files_info():
+    """
+    Directory listing for /api/files/browse
     
-    file_path = Path(output_files[resolution])
+    A background thread rebuilds the listing every BROWSE_CACHE_TTL seconds while
+    it is being requested, so growing files show their current size without the
+    request walking the directories. The request itself only compares directory
+    mtimes, and rebuilds inline when a file was added or removed.
+    """
+    global _browse_refresher
     
-    if not file_path.exists():
-        return jsonify({'error': 'File not found'}), 404
+    key = _browse_cache_key()
+    with _browse_cache_lock:
+        _browse_cache['requested'] = time.monotonic()
+        if _browse_refresher is None:
+            _browse_refresher = threading.Thread(target=_browse_refresh_loop, name='browse-refresher', daemon=True)
+            _browse_refresher.start()
+        if _browse_cache['key'] == key:
+            return _browse_cache['value']
     
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=file_path.name
-    )
+    return _refresh_files_info()
 
 
 @app.route('/api/files/browse')
 def browse_files():
     """Browse all files in downloads and outputs directories"""
     try:
-        files_info = {
-            'downloads': [],
-            'outputs': {},
-            'total_size': 0
-        }
-        
-        # List downloads folder
-        if DIRS['downloads'].exists():
-            for file_path in DIRS['downloads'].iterdir():
-                if file_path.is_file():
-                    size = file_path.stat().st_size
-                    files_info['downloads'].append({
-                        'name': file_path.name,
-                        'size': size,
-                        'size_mb': round(size / (1024 * 1024), 2),
-                        'modified': datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                        'path': str(file_path.relative_to(DIRS['downloads'].parent))
-                    })
-                    files_info['total_size'] += size
-        
-        # List outputs folder by resolution
-        if DIRS['outputs'].exists():
-            for resolution_dir in DIRS['outputs'].iterdir():
-                if resolution_dir.is_dir():
-                    resolution_files = []
-                    for file_path in resolution_dir.iterdir():
-                        if file_path.is_file():
-                            size = file_path.stat().st_size
-                            resolution_files.append({
-                                'name': file_path.name,
-                                'size': size,
-                                'size_mb': round(size / (1024 * 1024), 2),
-                                'modified': datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                                'path': str(file_path.relative_to(DIRS['outputs'].parent))
-                            })
-                            files_info['total_size'] += size
-                    files_info['outputs'][resolution_dir.name] = resolution_files
-        
-        files_info['total_size_mb'] = round(files_info['total_size'] / (1024 * 1024), 2)
-        files_info['total_size_gb'] = round(files_info['total_size'] / (1024 * 1024 * 1024), 2)
+        files_info = get_files_info()
         
         return jsonify({
             'success': True,
@@ -676,25 +1478,28 @@ def browse_files():
         }), 500
 
 
+# Root that /api/files/download paths must stay inside, resolved once
+DOWNLOAD_BASE_DIR = str(DIRS['downloads'].parent.resolve())
+
+
 @app.route('/api/files/download/<path:filepath>')
 def download_file_direct(filepath):
     """Download any file by relative path"""
     try:
-        # Security: ensure path doesn't escape base directory
-        base_dir = DIRS['downloads'].parent
-        file_path = (base_dir / filepath).resolve()
+        # Security: ensure path doesn't escape base directory. Backslashes and drive
+        # letters are refused up front (Windows would treat them as separators/anchors);
+        # resolving then catches '..' and symlinks that lead outside
+        if '\\' in filepath or PureWindowsPath(filepath).anchor or PurePosixPath(filepath).is_absolute():
+            return jsonify({'error': 'Invalid file path'}), 403
         
-        if not str(file_path).startswith(str(base_dir)):
+        file_path = os.path.realpath(os.path.join(DOWNLOAD_BASE_DIR, filepath))
+        if os.path.commonpath((file_path, DOWNLOAD_BASE_DIR)) != DOWNLOAD_BASE_DIR:
             return jsonify({'error': 'Invalid file path'}), 403
         
-        if not file_path.exists():
+        if not os.path.isfile(file_path):
             return jsonify({'error': 'File not found'}), 404
         
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=file_path.name
-        )
+        return send_protected_file(file_path, as_attachment=True, mimetype=None)
     except Exception as e:
         logger.error(f"Failed to download file: {e}")
         return jsonify({'error': str(e)}), 500
@@ -703,38 +1508,56 @@ def download_file_direct(filepath):
 @app.route('/api/system/status')
 def system_status():
     """Get system status including running job and capacity"""
-    return jsonify({
+    with _jobs_lock:
+        running_ids = list(running_jobs)
+        active_count = len(active_jobs)
+        completed_count = len(completed_jobs)
+    queued_count = _job_queue.qsize()
+    
+    etag = f"{','.join(running_ids)}-{active_count}-{completed_count}-{queued_count}"
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    return tagged_json({
         'success': True,
-        'has_running_job': current_running_job is not None,
-        'running_job_id': current_running_job,
-        'active_jobs_count': len(active_jobs),
-        'completed_jobs_count': len(completed_jobs),
-        'can_submit_new_job': current_running_job is None,
+        'has_running_job': bool(running_ids),
+        'running_job_id': running_ids[0] if running_ids else None,
+        'running_job_ids': running_ids,
+        'active_jobs_count': active_count,
+        'completed_jobs_count': completed_count,
+        'queued_jobs_count': queued_count,
+        'can_submit_new_job': queued_count < JOB_QUEUE_SIZE,
         'system_info': {
             'plan': 'Railway Free (2 vCPU, 1GB RAM)',
-            'max_concurrent_jobs': 1,
+            'max_concurrent_jobs': MAX_CONCURRENT_JOBS,
             'recommendation': 'Close browser tab after submitting - jobs run in background'
         }
-    })
+    }, etag)
 
 
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
+    with _jobs_lock:
+        active_count = len(active_jobs)
+        completed_count = len(completed_jobs)
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'active_jobs': len(active_jobs),
-        'completed_jobs': len(completed_jobs)
+        'active_jobs': active_count,
+        'completed_jobs': completed_count
     })
 
 
-def run_web_app():
-    """Start the Flask web application"""
-    print("\n" + "="*80)
-    print("AUTOMATED VIDEO PROCESSING SYSTEM - WEB INTERFACE")
-    print("="*80)
+def init_app_state():
+    """
+    Restore job state and start the background housekeeping
     
+    Called once per process before serving, by run_web_app() or wsgi.py. Job
+    state lives in this process, so an external server must run one worker
+    process (threads are fine).
+    """
     # Load previous job state
     print("\nLoading previous job state...")
     if load_jobs_from_disk():
@@ -745,15 +1568,42 @@ def run_web_app():
     else:
         print("No previous jobs found")
     
+    # Leave a full snapshot behind on a clean shutdown
+    atexit.register(compact_jobs_state)
+    
+    if JOB_TTL_SECONDS > 0:
+        threading.Thread(target=_expire_jobs_loop, name='jobs-expiry', daemon=True).start()
+
+
+def run_web_app():
+    """Start the Flask web application"""
+    print("\n" + "="*80)
+    print("AUTOMATED VIDEO PROCESSING SYSTEM - WEB INTERFACE")
+    print("="*80)
+    
+    init_app_state()
+    
     print(f"\nStarting web server on http://{WEB_CONFIG['host']}:{WEB_CONFIG['port']}")
     print("\nPress Ctrl+C to stop the server\n")
     print("="*80 + "\n")
     
-    app.run(
-        host=WEB_CONFIG['host'],
-        port=WEB_CONFIG['port'],
-        debug=WEB_CONFIG['debug']
-    )
+    if waitress is not None and not WEB_CONFIG['debug']:
+        # Fixed pool of request threads; slow clients and file bodies are handled by
+        # waitress' event loop instead of holding a thread each (the dev server spawns
+        # one thread per request)
+        waitress.serve(
+            app,
+            host=WEB_CONFIG['host'],
+            port=WEB_CONFIG['port'],
+            threads=WEB_CONFIG['server_threads'],
+            max_request_body_size=WEB_CONFIG['max_upload_size']  # waitress' default is 1GB
+        )
+    else:
+        app.run(
+            host=WEB_CONFIG['host'],
+            port=WEB_CONFIG['port'],
+            debug=WEB_CONFIG['debug']
+        )
 
 
 if __name__ == '__main__':
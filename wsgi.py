@@ -0,0 +1,12 @@
+"""
+WSGI entry point for running the web interface under an external server
+
+Job state is kept in process memory, so use a single worker process, e.g.:
+    gunicorn -w 1 --threads 8 -b 0.0.0.0:$PORT wsgi:application
+`python web_app.py` serves the same app with waitress.
+"""
+from web_app import app, init_app_state
+
+init_app_state()
+
+application = app